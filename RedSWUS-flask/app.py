@@ -1,27 +1,39 @@
-import os
-from flask import Flask, jsonify, request, Response
+import json
+from flask import Flask, jsonify, request, Response, stream_with_context
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning, module="torch")
 from models import db
 import time
 from flask_cors import CORS
+from runtime_config import configure_runtime, get_runtime_settings
+# 모델 로드 전에 CPU 스레드 예산 적용
+configure_runtime()
 from video_handlers import handle_upload_video
-from yolo_handlers import handle_yolo_predict
-from firstPrepro_handlers import handle_firstPrepro
-from std_handlers import run_all_handlers
-from secondPrepro_handlers import handle_secondPrepro
-from str_handlers import handle_str_predict
+from std_handlers import detectron_handler
+from str_handlers import str_app
+from job_handlers import handle_run_job, handle_resume_job, handle_job_status, handle_cancel_job
+from cancellation import CancelToken, JOB_TIMEOUT, client_disconnect_check, cancel_registry
+from streaming_pipeline import StreamingPipeline, StageFailed
+from yolo_handlers import VIDEO_EXTENSIONS
+from segment_pipeline import run_segmented, SEGMENT_SECONDS
+from quality_router import quality_router
+from db_config import configure_database, upgrade_schema
+from persistence import write_behind
+from live_stream import live_manager, check_source
+from export_handlers import handle_export
+from visualization_handlers import handle_annotated_frame, frame_annotator, THUMBNAIL_MAX_SIDE
+import queue
 from sqlalchemy import inspect
 
 app = Flask(__name__)
 CORS(app)
 
-# 현재 파일의 디렉토리 기준으로 SQLite 데이터베이스 경로 설정
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(basedir, 'video_analysis.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 데이터베이스 설정 (기본: 현재 파일 디렉토리의 SQLite, REDSWUS_DATABASE_URL 로 서버 DB 지정 가능)
+configure_database(app)
 
 db.init_app(app)
+# 결과 행은 전용 스레드에서 묶음으로 커밋
+write_behind.init_app(app)
 
 @app.route('/full_pipeline', methods=['POST'])
 def full_pipeline():
@@ -33,46 +45,13 @@ def full_pipeline():
         video_id = upload_response[0].get("video_id")
         print(video_id)
 
-        # Step 2: YOLO 탐지 수행
-        yolo_response = handle_yolo_predict(video_id=video_id)
-        if yolo_response[1] != 200:
-            return jsonify(yolo_response[0]), yolo_response[1]
-        response_data = yolo_response[0]
-        yolo_response_data = response_data.get_json()
-        yolo_result_code = yolo_response_data.get("yolo_result_code")
-        
-        # Step 3: 1차 전처리 수행
-        # print("@@@@@@@@@@")
-        first_prepro_response = handle_firstPrepro(yolo_result_code=yolo_result_code)
-        if first_prepro_response[1] != 200:
-            return jsonify(first_prepro_response[0]), first_prepro_response[1]
-        response_data = first_prepro_response[0]
-        first_result_list = response_data.get("first_code_list")
-
-        # Step 4: STD 수행
-        std_response = run_all_handlers(first_result_list=first_result_list)
-        if std_response[1] != 200:
-            return jsonify(std_response[0]), std_response[1]
-        std_result_code = std_response[0].get("std_result_list")
-        print(std_result_code)
-
-        # Step 5: 2차 전처리 수행
-        second_prepro_response = handle_secondPrepro(std_result_codes=std_result_code)
-        if second_prepro_response[1] != 200:
-            return jsonify(second_prepro_response[0]), second_prepro_response[1]
-        second_result_code = second_prepro_response[0].get("second_result_list")
-
-        # Step 6: STR 탐지 수행
-        str_response = handle_str_predict(second_code_list=second_result_code)
-        if str_response[1] != 200:
-            return jsonify(str_response[0]), str_response[1]
-
-        # 파이프라인 성공 결과 반환
-        return jsonify({
-            "status": "success",
-            "message": "Full pipeline completed successfully.",
-            "str_result": str_response[0].get("result")
-        }), 200
+        # Step 2~6: YOLO 탐지 -> 1차 전처리 -> STD -> 2차 전처리 -> STR
+        # 단계별 체크포인트가 남으므로 실패 시 /jobs/<id>/resume 으로 이어서 실행 가능
+        # 제한 시간(timeout, 초)을 넘기거나 클라이언트 연결이 끊기면 작업을 중단
+        cancel_token = CancelToken(job_timeout=request.form.get("timeout", JOB_TIMEOUT, type=float),
+                                   disconnect_check=client_disconnect_check(request.environ))
+        job_response = handle_run_job(video_id, cancel_token=cancel_token)
+        return jsonify(job_response[0]), job_response[1]
 
     except Exception as e:
         # 파이프라인 중 오류 발생 시 반환
@@ -82,6 +61,187 @@ def full_pipeline():
         }), 500
 
 
+@app.route('/stream_pipeline', methods=['POST'])
+def stream_pipeline():
+    # 전체 파이프라인을 스트리밍으로 실행: YOLO 가 뒤쪽 프레임을 찾는 동안 앞의 크롭이 STD/STR 까지 진행
+    # 인식 결과는 나오는 대로 NDJSON 한 줄씩 전송
+    upload_response = handle_upload_video()
+    if upload_response[1] != 200:
+        return jsonify(upload_response[0]), upload_response[1]
+    video_id = upload_response[0].get("video_id")
+    video_path = upload_response[0].get("file_path")
+    if not video_path.endswith(VIDEO_EXTENSIONS):
+        return jsonify({"message": "Unsupported file format. Only MP4, AVI, MKV, MOV, WMV are supported."}), 400
+
+    cancel_token = CancelToken(job_timeout=request.form.get("timeout", JOB_TIMEOUT, type=float), stage_timeouts={})
+    pipeline = StreamingPipeline(app, video_id, video_path, cancel_token=cancel_token)
+
+    def generate_results():
+        try:
+            for result in pipeline:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            yield json.dumps({"status": "success", "video_id": video_id}) + "\n"
+        except StageFailed as e:
+            yield json.dumps({"status": "error", "video_id": video_id, "message": str(e)}, ensure_ascii=False) + "\n"
+        except GeneratorExit:
+            # 클라이언트 연결이 끊기면 모든 단계와 비디오 디코더를 바로 정리
+            pipeline.stop("Client disconnected.")
+            raise
+        finally:
+            # 정상 종료/단계 실패 후 남은 단계 스레드 정리 (이미 중단 사유가 있으면 유지됨)
+            pipeline.stop()
+    return Response(generate_results(), content_type='application/x-ndjson')
+
+
+@app.route('/segmented_pipeline', methods=['POST'])
+def segmented_pipeline():
+    # 긴 비디오를 시간 구간으로 나눠 워커 프로세스들이 동시에 처리 (구간 길이는 segment_seconds 로 지정 가능)
+    upload_response = handle_upload_video()
+    if upload_response[1] != 200:
+        return jsonify(upload_response[0]), upload_response[1]
+    video_id = upload_response[0].get("video_id")
+    video_path = upload_response[0].get("file_path")
+    if not video_path.endswith(VIDEO_EXTENSIONS):
+        return jsonify({"message": "Unsupported file format. Only MP4, AVI, MKV, MOV, WMV are supported."}), 400
+
+    segment_seconds = request.form.get("segment_seconds", SEGMENT_SECONDS, type=float)
+    timeout = request.form.get("timeout", JOB_TIMEOUT, type=float)
+    response = run_segmented(video_id, video_path, segment_seconds=segment_seconds, timeout=timeout)
+    return jsonify(response[0]), response[1]
+
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    response = handle_job_status(job_id)
+    return jsonify(response[0]), response[1]
+
+
+@app.route('/jobs/<int:job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    # 완료된 단계/항목은 건너뛰고 남은 작업만 실행
+    cancel_token = CancelToken(job_timeout=request.form.get("timeout", JOB_TIMEOUT, type=float),
+                               disconnect_check=client_disconnect_check(request.environ))
+    response = handle_resume_job(job_id, cancel_token=cancel_token)
+    return jsonify(response[0]), response[1]
+
+
+@app.route('/jobs/<int:job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    # 실행 중인 작업 중단 (대기 중인 배치 요청 취소)
+    response = handle_cancel_job(job_id)
+    return jsonify(response[0]), response[1]
+
+
+@app.route('/runtime', methods=['GET'])
+def runtime_diagnostics():
+    # 현재 적용된 스레드 예산 확인용
+    settings = get_runtime_settings()
+    settings["schedulers"] = {
+        "std": detectron_handler.scheduler.stats(),
+        "str": str_app.scheduler.stats()
+    }
+    settings["routing"] = quality_router.stats()
+    settings["std_size_policy"] = detectron_handler.size_policy.stats()
+    settings["str_cache"] = str_app.cache.stats()
+    settings["write_behind"] = write_behind.stats()
+    settings["thumbnails"] = frame_annotator.stats()
+    settings["running_jobs"] = cancel_registry.running()
+    return jsonify(settings), 200
+
+
+@app.route('/export', methods=['GET'])
+def export_results():
+    # 인식 결과를 NDJSON/CSV/Parquet 으로 청크 단위 스트리밍 (비디오, 업로드 시각, 비디오 내 시각, 신뢰도 필터)
+    response = handle_export(request.args)
+    if response[1] != 200:
+        return jsonify(response[0]), response[1]
+    body = response[0]
+    return Response(stream_with_context(body["chunks"]), mimetype=body["mimetype"],
+                    headers={"Content-Disposition": f"attachment; filename={body['filename']}"})
+
+
+@app.route('/videos/<int:video_id>/frames/<int:frame_index>/annotated', methods=['GET'])
+def annotated_frame(video_id, frame_index):
+    # 저장된 STD 박스 / STR 텍스트를 원본 프레임 위에 그려서 반환 (요청이 있을 때만 렌더링)
+    max_side = request.args.get("max_side", THUMBNAIL_MAX_SIDE, type=int)
+    response = handle_annotated_frame(video_id, frame_index, max_side=max_side, if_none_match=request.if_none_match)
+    if response[1] == 304:
+        not_modified = Response(status=304)
+        not_modified.set_etag(response[0]["etag"])
+        return not_modified
+    if response[1] != 200:
+        return jsonify(response[0]), response[1]
+    image_response = Response(response[0]["image"], mimetype='image/jpeg')
+    image_response.set_etag(response[0]["etag"])
+    # 결과가 추가될 수 있으므로 매번 ETag 로 재검증
+    image_response.cache_control.no_cache = True
+    return image_response
+
+
+@app.route('/live', methods=['POST'])
+def start_live_stream():
+    # 허용된 카메라 주소 또는 업로드된 비디오 파일 (replay=true 면 파일을 실시간 속도로 재생)
+    data = request.get_json(silent=True) or {}
+    source = data.get("source")
+    replay = bool(data.get("replay", False))
+    error = check_source(source, replay=replay)
+    if error:
+        return jsonify({"message": error}), 400
+    sample_fps = None
+    if data.get("sample_fps") is not None:
+        try:
+            sample_fps = float(data["sample_fps"])
+        except (TypeError, ValueError):
+            sample_fps = None
+        if sample_fps is None or not 0 < sample_fps < float("inf"):
+            return jsonify({"message": "sample_fps must be a positive number."}), 400
+    stream = live_manager.start(source, replay=replay, sample_fps=sample_fps)
+    return jsonify({"status": "success", "stream_id": stream.stream_id}), 200
+
+
+@app.route('/live/<int:stream_id>/events')
+def live_stream_events(stream_id):
+    # 인식 결과를 Server-Sent Events 로 전송 (느린 구독자의 이벤트는 버려짐)
+    stream = live_manager.get(stream_id)
+    if not stream:
+        return jsonify({"message": f"Live stream {stream_id} not found."}), 404
+    subscriber = stream.subscribe()
+
+    def generate_events():
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=15)
+                except queue.Empty:
+                    if not stream.running:
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield f"event: end\ndata: {json.dumps(stream.metrics(), ensure_ascii=False)}\n\n"
+        finally:
+            stream.unsubscribe(subscriber)
+    return Response(generate_events(), content_type='text/event-stream')
+
+
+@app.route('/live/<int:stream_id>/metrics', methods=['GET'])
+def live_stream_metrics(stream_id):
+    stream = live_manager.get(stream_id)
+    if not stream:
+        return jsonify({"message": f"Live stream {stream_id} not found."}), 404
+    return jsonify(stream.metrics()), 200
+
+
+@app.route('/live/<int:stream_id>', methods=['DELETE'])
+def stop_live_stream(stream_id):
+    stream = live_manager.stop(stream_id)
+    if not stream:
+        return jsonify({"message": f"Live stream {stream_id} not found."}), 404
+    return jsonify(stream.metrics()), 200
+
+
 @app.route('/log-stream')
 def log_stream():
     def generate_logs():
@@ -98,6 +258,7 @@ def log_stream():
 if __name__ == '__main__':
     with app.app_context():  # 컨텍스트 활성화
         db.create_all()  # 테이블 생성
+        upgrade_schema(db)  # 기존 테이블에 새 컬럼 반영
         inspector = inspect(db.engine)  # Inspector 객체 생성
         tables = inspector.get_table_names()  # 테이블 이름 가져오기
         print("테이블 목록:", tables)
@@ -0,0 +1,341 @@
+# bench_load.py
+# Flask 서비스 부하 테스트: 동시 요청 수별 처리량, 지연 시간 분위수, 오류율을 JSON 으로 기록
+# 사용 예:
+#   python bench_load.py --stub --concurrency 1 4 8 --requests 40 --output load_report.json
+#   python bench_load.py --stub --mix full_pipeline=3,stream_pipeline=1,runtime=1 --videos ./samples
+#   python bench_load.py --serve --stub --port 5001            (가짜 백엔드로 서버만 실행)
+#   python bench_load.py --url http://127.0.0.1:5001 --concurrency 4   (실행 중인 서버 대상)
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+# 모델 핸들러(torch / detectron2)는 서버를 같은 프로세스에서 띄울 때만 setup_backends 에서 import
+from frame_source import VIDEO_EXTENSIONS
+
+# 지원하는 요청 종류 (가짜 백엔드 선택은 환경변수라 구간 분할 처리의 워커 프로세스에도 적용됨)
+ENDPOINTS = ("full_pipeline", "stream_pipeline", "segmented_pipeline", "runtime")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="RedSWUS load test")
+    parser.add_argument("--url", help="base URL of a running server (default: in-process test client)")
+    parser.add_argument("--serve", action="store_true", help="only run the server (use with --stub)")
+    parser.add_argument("--port", type=int, default=5001, help="port for --serve")
+    parser.add_argument("--stub", action="store_true", help="replace YOLO/Detectron2/PARSeq with stub backends")
+    parser.add_argument("--stub-yolo-ms", type=float, default=20.0, help="stub YOLO latency per frame")
+    parser.add_argument("--stub-std-ms", type=float, nargs=2, default=[10.0, 15.0], metavar=("BASE", "PER_ITEM"),
+                        help="stub STD latency per batch / per image")
+    parser.add_argument("--stub-str-ms", type=float, nargs=2, default=[5.0, 1.0], metavar=("BASE", "PER_ITEM"),
+                        help="stub STR latency per batch / per crop")
+    parser.add_argument("--no-str-cache", action="store_true", help="disable the STR recognition cache")
+    parser.add_argument("--videos", nargs="+", default=[], help="sample video files or folders")
+    parser.add_argument("--mix", default="full_pipeline=1", help="request mix, e.g. full_pipeline=3,runtime=1")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4], help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="requests per concurrency level")
+    parser.add_argument("--duration", type=float, help="seconds per level (overrides --requests)")
+    parser.add_argument("--warmup", type=int, default=1, help="warmup requests before measuring")
+    parser.add_argument("--timeout", type=float, default=600.0, help="HTTP request timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_report.json", help="JSON report path")
+    return parser
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def find_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(VIDEO_EXTENSIONS)
+            ))
+        elif path.endswith(VIDEO_EXTENSIONS):
+            videos.append(path)
+    if not videos:
+        # 샘플이 없으면 합성 비디오 사용
+        from stub_backends import make_sample_video
+        videos.append(make_sample_video("./load_samples/sample.mp4"))
+    return videos
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _upload_name(video_path):
+    # 업로드 파일명이 같으면 동시 요청끼리 파일을 덮어쓰므로 요청마다 고유한 이름 사용
+    return f"load_{uuid.uuid4().hex[:8]}_{os.path.basename(video_path)}"
+
+
+class TestClientTarget:
+    """같은 프로세스의 Flask test client 로 요청 (스레드마다 client 를 따로 둠)."""
+
+    name = "test_client"
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_data()
+
+    def upload(self, path, video_path, video_bytes):
+        response = self.client.post(path, data={"file": (io.BytesIO(video_bytes), _upload_name(video_path))},
+                                    content_type="multipart/form-data")
+        # 스트리밍 응답은 여기서 끝까지 읽힘
+        return response.status_code, response.get_data()
+
+
+class HTTPTarget:
+    """실행 중인 서버에 HTTP 로 요청."""
+
+    name = "http"
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+    def upload(self, path, video_path, video_bytes):
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\n".encode(),
+            f'Content-Disposition: form-data; name="file"; filename="{_upload_name(video_path)}"\r\n'.encode(),
+            b"Content-Type: application/octet-stream\r\n\r\n",
+            video_bytes,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        request = urllib.request.Request(self.base_url + path, data=body, method="POST",
+                                         headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        return self._send(request)
+
+
+def _stream_failed(body):
+    # NDJSON 스트림은 상태 코드 200 으로 시작하므로 마지막 줄로 성공 여부 판단
+    lines = [line for line in body.splitlines() if line.strip()]
+    if not lines:
+        return True
+    try:
+        return json.loads(lines[-1]).get("status") != "success"
+    except ValueError:
+        return True
+
+
+def send_request(target, endpoint, video_path, video_bytes):
+    start = time.perf_counter()
+    error = None
+    try:
+        if endpoint == "runtime":
+            status, body = target.get("/runtime")
+        else:
+            status, body = target.upload(f"/{endpoint}", video_path, video_bytes)
+        if status >= 400:
+            error = f"HTTP {status}"
+        elif endpoint == "stream_pipeline" and _stream_failed(body):
+            error = "stream error"
+    except Exception as e:
+        status, error = None, f"{type(e).__name__}: {e}"
+    return {
+        "endpoint": endpoint,
+        "status": status,
+        "error": error,
+        "latency": time.perf_counter() - start,
+    }
+
+
+def summarize(records, elapsed):
+    latencies = np.array([record["latency"] for record in records]) * 1000
+    errors = [record for record in records if record["error"]]
+    summary = {
+        "requests": len(records),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(records), 4) if records else 0.0,
+        "throughput_rps": round(len(records) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 1),
+            "p50": round(float(np.percentile(latencies, 50)), 1),
+            "p90": round(float(np.percentile(latencies, 90)), 1),
+            "p95": round(float(np.percentile(latencies, 95)), 1),
+            "p99": round(float(np.percentile(latencies, 99)), 1),
+            "max": round(float(latencies.max()), 1),
+        } if records else None,
+        "status_codes": dict(Counter(str(record["status"]) for record in records)),
+        "error_samples": sorted(Counter(record["error"] for record in errors).items(), key=lambda item: -item[1])[:5],
+    }
+    return summary
+
+
+def run_level(target, concurrency, weights, videos, total_requests=None, duration=None, seed=0):
+    """concurrency 개의 클라이언트가 쉬지 않고 요청을 보낸다 (closed loop)."""
+    rng = random.Random(seed)
+    endpoints, endpoint_weights = zip(*weights.items())
+    plan_lock = threading.Lock()
+    records = []
+    issued = [0]
+
+    def next_request():
+        with plan_lock:
+            if duration is None and issued[0] >= total_requests:
+                return None
+            issued[0] += 1
+            return rng.choices(endpoints, endpoint_weights)[0], rng.choice(list(videos))
+
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        while deadline is None or time.perf_counter() < deadline:
+            planned = next_request()
+            if planned is None:
+                return
+            endpoint, video_path = planned
+            record = send_request(target, endpoint, video_path, videos[video_path])
+            with plan_lock:
+                records.append(record)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, name=f"load-client-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    level = {"concurrency": concurrency, "duration_s": round(elapsed, 3)}
+    level.update(summarize(records, elapsed))
+    level["endpoints"] = {
+        endpoint: summarize([record for record in records if record["endpoint"] == endpoint], elapsed)
+        for endpoint in endpoints
+    }
+    return level
+
+
+def runtime_snapshot(target):
+    try:
+        status, body = target.get("/runtime")
+        return json.loads(body) if status == 200 else None
+    except Exception:
+        return None
+
+
+def setup_backends(args):
+    # 같은 프로세스에서 서버를 띄울 때만 모델/앱을 로드 (--url 대상일 때는 불필요)
+    if args.stub:
+        # 핸들러가 생성되기 전에 가짜 백엔드를 선택해야 가중치를 로드하지 않음 (구간 분할 워커에도 상속됨)
+        from stub_backends import STUB_MODELS_ENV
+        os.environ[STUB_MODELS_ENV] = "1"
+        os.environ["REDSWUS_STUB_LATENCY_MS_YOLO"] = f"0,{args.stub_yolo_ms}"
+        os.environ["REDSWUS_STUB_LATENCY_MS_STD"] = ",".join(str(ms) for ms in args.stub_std_ms)
+        os.environ["REDSWUS_STUB_LATENCY_MS_STR"] = ",".join(str(ms) for ms in args.stub_str_ms)
+    from app import app
+    from models import db
+    from db_config import upgrade_schema
+    from str_handlers import str_app
+
+    if args.no_str_cache:
+        str_app.cache.capacity = 0
+    with app.app_context():
+        db.create_all()
+        upgrade_schema(db)
+    return app
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+
+    if args.serve:
+        app = setup_backends(args)
+        print(f"{'stub' if args.stub else 'real'} 백엔드로 서버 실행: http://127.0.0.1:{args.port}")
+        app.run(host="0.0.0.0", port=args.port, threaded=True)
+        raise SystemExit
+
+    if args.url:
+        target = HTTPTarget(args.url, args.timeout)
+    else:
+        target = TestClientTarget(setup_backends(args))
+
+    weights = parse_mix(args.mix)
+    videos = {}
+    for video_path in find_videos(args.videos):
+        with open(video_path, "rb") as f:
+            videos[video_path] = f.read()
+
+    # 측정할 엔드포인트마다 워밍업 (스트리밍/구간 분할 경로의 스레드, 워커 프로세스도 미리 띄움)
+    video_path, video_bytes = next(iter(videos.items()))
+    for _ in range(args.warmup):
+        for endpoint in weights:
+            send_request(target, endpoint, video_path, video_bytes)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "target": args.url or target.name,
+            "backend": "stub" if args.stub else ("remote" if args.url else "real"),
+            "stub_latency_ms": {
+                "yolo_per_frame": args.stub_yolo_ms,
+                "std": args.stub_std_ms,
+                "str": args.stub_str_ms,
+            } if args.stub else None,
+            "str_cache": not args.no_str_cache,
+            "mix": weights,
+            "videos": [{"path": path, "bytes": len(data)} for path, data in videos.items()],
+            "requests_per_level": None if args.duration else args.requests,
+            "duration_per_level": args.duration,
+        },
+        "levels": [],
+    }
+
+    print("concurrency  requests  errors  req/s    p50(ms)   p95(ms)   p99(ms)")
+    for concurrency in args.concurrency:
+        level = run_level(target, concurrency, weights, videos, total_requests=args.requests,
+                          duration=args.duration, seed=args.seed)
+        report["levels"].append(level)
+        latency = level["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0}
+        print(f"{concurrency:>11}  {level['requests']:>8}  {level['errors']:>6}  {level['throughput_rps']:>6.2f}"
+              f"  {latency['p50']:>8.1f}  {latency['p95']:>8.1f}  {latency['p99']:>8.1f}")
+
+    report["runtime"] = runtime_snapshot(target)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"결과 저장: {args.output}")
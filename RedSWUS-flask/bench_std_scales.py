@@ -0,0 +1,85 @@
+# bench_std_scales.py
+# STD 입력 크기별 지연 시간 / 재현율 비교 스크립트
+# 가장 큰 크기의 탐지 결과를 기준(정답)으로 삼아, 작은 크기에서 몇 개를 다시 찾는지 측정한다.
+# 사용 예: python bench_std_scales.py --input ./first_preprocessed --scales 480 640 800 --max-side 1500
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+import torch
+
+from detectron2.config import get_cfg
+from predictor import BatchPredictor
+from size_policy import SizePolicy
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="STD test-scale benchmark")
+    parser.add_argument("--config-file", default="./config.yaml", metavar="FILE")
+    parser.add_argument("--weights", default="./pt/model_0000599.pth", metavar="pth")
+    parser.add_argument("--input", default="./first_preprocessed", help="folder of sample images")
+    parser.add_argument("--scales", type=int, nargs="+", default=[480, 640, 800],
+                        help="short-side test scales to compare")
+    parser.add_argument("--max-side", type=int, default=1500, help="maximum long side")
+    parser.add_argument("--limit", type=int, default=50, help="maximum number of sample images")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold for a match")
+    return parser
+
+
+def box_iou(a, b):
+    # a: (N, 4), b: (M, 4) -> (N, M)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def detect(predictor, image, scale):
+    start = time.perf_counter()
+    output = predictor.predict_batch([SizePolicy.resize(image, scale)], resize=False)[0]
+    elapsed = time.perf_counter() - start
+    boxes = output["instances"].to("cpu").pred_boxes.tensor.numpy()
+    return SizePolicy.rescale_boxes(boxes, scale), elapsed
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+
+    cfg = get_cfg()
+    cfg.merge_from_file(args.config_file)
+    cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.5
+    cfg.MODEL.WEIGHTS = args.weights
+    cfg.MODEL.DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+    predictor = BatchPredictor(cfg)
+
+    paths = sorted(glob.glob(os.path.join(args.input, "*")))
+    images = [image for image in (cv2.imread(path) for path in paths[:args.limit]) if image is not None]
+    if not images:
+        raise SystemExit(f"No readable images in {args.input}")
+
+    scales = sorted(args.scales)
+    results = {}
+    for scale_size in scales:
+        policy = SizePolicy(args.max_side, [scale_size])
+        results[scale_size] = [detect(predictor, image, policy.choose_scale(image)) for image in images]
+
+    # 가장 큰 크기의 결과를 기준으로 재현율 계산
+    reference = results[scales[-1]]
+    total_reference = sum(len(boxes) for boxes, _ in reference)
+
+    print("scale  avg latency (s)  boxes  recall vs {}".format(scales[-1]))
+    for scale_size in scales:
+        matched = 0
+        for (boxes, _), (ref_boxes, _) in zip(results[scale_size], reference):
+            if len(boxes) and len(ref_boxes):
+                matched += int((box_iou(ref_boxes, boxes).max(axis=1) >= args.iou).sum())
+        latency = sum(elapsed for _, elapsed in results[scale_size]) / len(images)
+        recall = matched / total_reference if total_reference else 1.0
+        boxes_found = sum(len(boxes) for boxes, _ in results[scale_size])
+        print(f"{scale_size:>5}  {latency:>15.3f}  {boxes_found:>5}  {recall:>13.3f}")
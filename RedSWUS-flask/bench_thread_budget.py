@@ -0,0 +1,74 @@
+# bench_thread_budget.py
+# 동시 요청 수 x 스레드 예산 조합별 처리량 측정 스크립트
+# 사용 예: python bench_thread_budget.py --concurrency 1 2 4 --budgets 1 2 4 8
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import torch
+
+from firstPrepro_handlers import preprocess_image
+from runtime_config import CPU_COUNT, compute_budgets
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="CPU thread budget benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4],
+                        help="simulated concurrent requests")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[1, 2, 4],
+                        help="threads per stage to try (torch / cv2)")
+    parser.add_argument("--items", type=int, default=8, help="crops per simulated request")
+    parser.add_argument("--size", type=int, default=640, help="synthetic crop side length")
+    return parser
+
+
+def make_workload(size):
+    # YOLO 패딩 크롭 크기와 비슷한 합성 이미지, STD/STR 대신 사용할 합성곱 모델
+    image = np.random.randint(0, 255, (size, size, 3), dtype=np.uint8)
+    model = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 32, 3, padding=1),
+        torch.nn.ReLU(),
+        torch.nn.Conv2d(32, 32, 3, padding=1),
+    ).eval()
+    tensor = torch.rand(1, 3, size // 2, size // 2)
+    return image, model, tensor
+
+
+@torch.inference_mode()
+def run_request(image, model, tensor, items):
+    for _ in range(items):
+        preprocess_image(image)
+        model(tensor)
+
+
+def bench(concurrency, budget, items, workload):
+    torch.set_num_threads(budget)
+    cv2.setNumThreads(budget)
+    image, model, tensor = workload
+
+    # 워밍업
+    run_request(image, model, tensor, 1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(run_request, image, model, tensor, items) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return concurrency * items / elapsed
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    workload = make_workload(args.size)
+
+    print("concurrency  budget  oversubscription  items/s")
+    for concurrency in args.concurrency:
+        for budget in args.budgets:
+            throughput = bench(concurrency, budget, args.items, workload)
+            oversubscription = concurrency * budget / CPU_COUNT
+            print(f"{concurrency:>11}  {budget:>6}  {oversubscription:>16.2f}  {throughput:>7.2f}")
+        budgets = compute_budgets(concurrency)
+        print(f"  -> configured budget for concurrency {concurrency}: "
+              f"torch {budgets['torch']}, prepro {budgets['prepro']}, total {budgets['total']}/{CPU_COUNT}")
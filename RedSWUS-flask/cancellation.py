@@ -0,0 +1,159 @@
+# cancellation.py
+# 작업/단계 제한 시간과 협조적 취소 (DELETE /jobs/<id>, 클라이언트 연결 끊김)
+# 핸들러는 항목 사이와 모델 결과를 기다리는 동안 CancelToken 을 확인하고,
+# 취소되면 아직 실행되지 않은 배치 요청(YOLO/STD/STR)을 취소한 뒤 예외로 빠져나온다.
+import os
+import selectors
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# 단계별 / 작업 전체 제한 시간 (초, 0 이면 제한 없음)
+# 처리 시간은 비디오 길이에 비례하므로 기본값은 제한 없음. 운영 환경에 맞게 환경변수로 지정한다.
+STAGE_TIMEOUTS = {
+    stage: float(os.environ.get(f"REDSWUS_TIMEOUT_{stage.upper()}", "0"))
+    for stage in ("yolo", "first_prepro", "std", "second_prepro", "str")
+}
+JOB_TIMEOUT = float(os.environ.get("REDSWUS_JOB_TIMEOUT", "0"))
+# 클라이언트 연결 확인 간격 (초)
+DISCONNECT_CHECK_INTERVAL = float(os.environ.get("REDSWUS_DISCONNECT_CHECK_INTERVAL", "1.0"))
+
+
+class JobCancelled(Exception):
+    """작업이 취소됨 (취소 요청, 클라이언트 연결 끊김)."""
+
+
+class DeadlineExceeded(JobCancelled):
+    """작업 또는 단계 제한 시간 초과."""
+
+
+class CancelToken:
+    """
+    작업 하나의 취소 상태와 제한 시간.
+    check() 는 취소됐거나 제한 시간이 지났으면 예외를 던진다.
+    event 는 취소 시 set 되므로 스레드들이 대기 중에도 바로 깨어날 수 있다.
+    """
+
+    def __init__(self, job_timeout=JOB_TIMEOUT, stage_timeouts=None, disconnect_check=None):
+        self.event = threading.Event()
+        self.reason = None
+        self.timed_out = False
+        self.job_deadline = time.monotonic() + job_timeout if job_timeout else None
+        self.stage_timeouts = STAGE_TIMEOUTS if stage_timeouts is None else stage_timeouts
+        self.stage = None
+        self.stage_deadline = None
+        self.disconnect_check = disconnect_check
+        self._next_disconnect_check = 0.0
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self, reason="Job cancelled.", timed_out=False):
+        if not self.event.is_set():
+            self.reason = reason
+            self.timed_out = timed_out
+            self.event.set()
+
+    def start_stage(self, stage):
+        self.stage = stage
+        timeout = self.stage_timeouts.get(stage)
+        self.stage_deadline = time.monotonic() + timeout if timeout else None
+        self.check()
+
+    def remaining(self):
+        """가장 가까운 마감까지 남은 시간 (초). 제한이 없으면 None."""
+        deadlines = [deadline for deadline in (self.job_deadline, self.stage_deadline) if deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def check(self):
+        if not self.event.is_set():
+            now = time.monotonic()
+            if self.job_deadline is not None and now >= self.job_deadline:
+                self.cancel("Job deadline exceeded.", timed_out=True)
+            elif self.stage_deadline is not None and now >= self.stage_deadline:
+                self.cancel(f"Stage '{self.stage}' deadline exceeded.", timed_out=True)
+            elif self.disconnect_check is not None and now >= self._next_disconnect_check:
+                self._next_disconnect_check = now + DISCONNECT_CHECK_INTERVAL
+                if self.disconnect_check():
+                    self.cancel("Client disconnected.")
+        if self.event.is_set():
+            raise (DeadlineExceeded if self.timed_out else JobCancelled)(self.reason)
+
+    def wait(self, future, poll_interval=0.1):
+        """
+        future 의 결과를 기다린다. 기다리는 중 취소/마감되면 future 를 취소하고 예외를 던진다.
+        (BatchScheduler 는 취소된 요청을 배치에서 제외한다)
+        """
+        try:
+            while True:
+                self.check()
+                try:
+                    return future.result(timeout=poll_interval)
+                except FutureTimeout:
+                    continue
+        except JobCancelled:
+            future.cancel()
+            raise
+
+
+def client_disconnect_check(environ):
+    """
+    WSGI 요청의 소켓을 확인해 클라이언트 연결이 끊겼는지 알려 주는 함수를 반환한다.
+    (Werkzeug 개발 서버, gunicorn 지원. 소켓을 알 수 없거나 TLS 면 None)
+    """
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None or isinstance(sock, ssl.SSLSocket):
+        return None
+
+    def disconnected():
+        # select() 는 fd 가 1024 이상이면 ValueError 를 던지므로 selectors (epoll/kqueue/poll) 사용
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(sock, selectors.EVENT_READ)
+                readable = bool(selector.select(0))
+            # 요청 본문은 이미 읽었으므로, 읽을 수 있는데 데이터가 없으면 연결이 닫힌 것
+            return readable and sock.recv(1, socket.MSG_PEEK) == b""
+        except (ConnectionResetError, BrokenPipeError):
+            return True
+        except (OSError, ValueError):
+            # 확인 자체가 실패한 경우는 연결 상태를 알 수 없으므로 작업을 취소하지 않음
+            return False
+    return disconnected
+
+
+# 실행 중인 작업의 취소 토큰 관리 클래스
+class CancelRegistry:
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def register(self, job_id, token):
+        with self._lock:
+            if job_id in self._tokens:
+                return False
+            self._tokens[job_id] = token
+            return True
+
+    def unregister(self, job_id):
+        with self._lock:
+            self._tokens.pop(job_id, None)
+
+    def cancel(self, job_id, reason="Job cancelled by request."):
+        with self._lock:
+            token = self._tokens.get(job_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def running(self):
+        with self._lock:
+            return sorted(self._tokens)
+
+# CancelRegistry 인스턴스 생성
+cancel_registry = CancelRegistry()
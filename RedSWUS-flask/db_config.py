@@ -0,0 +1,66 @@
+# db_config.py
+# 데이터베이스 URL / 커넥션 풀 설정 (SQLite 기본, 서버 DB 는 REDSWUS_DATABASE_URL 로 지정)
+import os
+import sqlite3
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+DATABASE_URL = os.environ.get("REDSWUS_DATABASE_URL") or f"sqlite:///{os.path.join(basedir, 'video_analysis.db')}"
+
+# 서버 DB(PostgreSQL 등) 커넥션 풀 크기
+POOL_SIZE = int(os.environ.get("REDSWUS_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("REDSWUS_DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.environ.get("REDSWUS_DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.environ.get("REDSWUS_DB_POOL_RECYCLE", "1800"))
+
+
+def engine_options(database_url):
+    if database_url.startswith("sqlite"):
+        # SQLite 는 파일 잠금으로 쓰기를 직렬화하므로 풀 대신 잠금 대기 시간만 설정
+        return {"connect_args": {"timeout": 30, "check_same_thread": False}}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def configure_database(app, database_url=DATABASE_URL):
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+
+
+def upgrade_schema(db):
+    """
+    create_all() 은 기존 테이블에 새 컬럼을 추가하지 않으므로,
+    모델에 추가된 nullable 컬럼과 인덱스를 기존 DB 에 반영한다.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"컬럼 추가: {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: 쓰는 동안에도 읽기 가능, synchronous=NORMAL: 커밋마다 fsync 하지 않음
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
@@ -0,0 +1,228 @@
+# export_handlers.py
+# 인식 결과를 NDJSON / CSV / Parquet 으로 스트리밍 내보내기
+# 서버 측 커서로 chunk_size 행씩 읽어 바로 내보내므로 결과 수와 관계없이 메모리 사용량이 일정하다.
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from sqlalchemy import select
+from models import db, Video, FirstPreprocessingResult, StdResult, SecondPreprocessingResult, StrResult
+from yolo_handlers import PAD_X, PAD_Y
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("REDSWUS_EXPORT_CHUNK_SIZE", "1000"))
+
+# crop_box_*: 텍스트 박스 좌표. 프레임이 아니라 YOLO 가 잘라 낸 크롭(패딩 제외) 기준 픽셀 좌표이다.
+# 프레임 좌표가 필요하면 YOLO 라벨의 크롭 위치를 더해야 한다 (visualization_handlers 참고).
+EXPORT_COLUMNS = (
+    "video_code", "video_path", "upload_time", "str_result_code", "frame_index", "timestamp",
+    "crop_box_x1", "crop_box_y1", "crop_box_x2", "crop_box_y2", "box_score", "text", "confidence",
+)
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class _ChunkSink:
+    """ParquetWriter 출력을 모아 두었다가 row group 마다 꺼내 보내는 파일 객체."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# 결과 내보내기 클래스
+class ResultExporter:
+    def build_query(self, video_ids=None, since=None, until=None, start=None, end=None, min_confidence=None):
+        """
+        STR 결과 한 행 = 비디오, 프레임 시각, 텍스트 박스, 텍스트.
+        since/until 은 비디오 업로드 시각, start/end 는 비디오 안에서의 시각(초) 필터.
+        """
+        stmt = (
+            select(
+                Video.video_code, Video.video_path, Video.upload_time, Video.fps,
+                StrResult.str_result_code, StrResult.str_result_path, StrResult.text, StrResult.confidence,
+                FirstPreprocessingResult.frame_index,
+                StdResult.box_x1, StdResult.box_y1, StdResult.box_x2, StdResult.box_y2, StdResult.score,
+            )
+            .select_from(StrResult)
+            .join(Video, Video.video_code == StrResult.video_code)
+            .join(SecondPreprocessingResult, SecondPreprocessingResult.second_result_code == StrResult.second_result_code)
+            .join(StdResult, StdResult.std_result_code == SecondPreprocessingResult.std_result_code)
+            .join(FirstPreprocessingResult, FirstPreprocessingResult.first_result_code == StdResult.first_result_code)
+            .order_by(StrResult.str_result_code)
+        )
+        if video_ids:
+            stmt = stmt.where(StrResult.video_code.in_(video_ids))
+        if since is not None:
+            stmt = stmt.where(Video.upload_time >= since)
+        if until is not None:
+            stmt = stmt.where(Video.upload_time < until)
+        if start is not None:
+            stmt = stmt.where(FirstPreprocessingResult.frame_index >= start * Video.fps)
+        if end is not None:
+            stmt = stmt.where(FirstPreprocessingResult.frame_index < end * Video.fps)
+        if min_confidence is not None:
+            stmt = stmt.where(StrResult.confidence >= min_confidence)
+        return stmt
+
+    @staticmethod
+    def _crop_coordinate(value, pad):
+        # DB 에는 패딩된 크롭 기준으로 저장되어 있으므로 패딩만큼 빼서 YOLO 크롭 기준으로 변환
+        return value - pad if value is not None else None
+
+    @classmethod
+    def _to_row(cls, row):
+        text = row.text
+        if text is None and row.str_result_path and os.path.exists(row.str_result_path):
+            # 텍스트 컬럼이 생기기 전에 저장된 결과만 파일에서 읽음
+            with open(row.str_result_path) as f:
+                text = f.read()
+        timestamp = None
+        if row.frame_index is not None and row.fps:
+            timestamp = round(row.frame_index / row.fps, 3)
+        return {
+            "video_code": row.video_code,
+            "video_path": row.video_path,
+            "upload_time": row.upload_time,
+            "str_result_code": row.str_result_code,
+            "frame_index": row.frame_index,
+            "timestamp": timestamp,
+            "crop_box_x1": cls._crop_coordinate(row.box_x1, PAD_X),
+            "crop_box_y1": cls._crop_coordinate(row.box_y1, PAD_Y),
+            "crop_box_x2": cls._crop_coordinate(row.box_x2, PAD_X),
+            "crop_box_y2": cls._crop_coordinate(row.box_y2, PAD_Y),
+            "box_score": row.score,
+            "text": text,
+            "confidence": row.confidence,
+        }
+
+    def iter_chunks(self, stmt, chunk_size=EXPORT_CHUNK_SIZE):
+        """서버 측 커서로 chunk_size 행씩 읽어 행 리스트를 반환하는 제너레이터."""
+        result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+        try:
+            for partition in result.partitions(chunk_size):
+                yield [self._to_row(row) for row in partition]
+        finally:
+            result.close()
+
+    @staticmethod
+    def to_ndjson(chunks):
+        for rows in chunks:
+            yield "".join(json.dumps(row, ensure_ascii=False, default=_iso) + "\n" for row in rows).encode("utf-8")
+
+    @staticmethod
+    def to_csv(chunks):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for rows in chunks:
+            writer.writerows({key: _iso(value) for key, value in row.items()} for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def to_parquet(chunks):
+        schema = pa.schema([
+            ("video_code", pa.int64()), ("video_path", pa.string()), ("upload_time", pa.timestamp("us")),
+            ("str_result_code", pa.int64()), ("frame_index", pa.int64()), ("timestamp", pa.float64()),
+            ("crop_box_x1", pa.int64()), ("crop_box_y1", pa.int64()),
+            ("crop_box_x2", pa.int64()), ("crop_box_y2", pa.int64()),
+            ("box_score", pa.float64()), ("text", pa.string()), ("confidence", pa.float64()),
+        ])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            # 청크 하나 = row group 하나
+            for rows in chunks:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def export(self, fmt, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+        chunks = self.iter_chunks(self.build_query(**filters), chunk_size)
+        if fmt == "csv":
+            return self.to_csv(chunks)
+        if fmt == "parquet":
+            return self.to_parquet(chunks)
+        return self.to_ndjson(chunks)
+
+# ResultExporter 인스턴스 생성
+result_exporter = ResultExporter()
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+# 핸들러 함수
+def handle_export(args):
+    """
+    쿼리 파라미터: format, video_id (여러 번 가능), since, until (ISO 시각),
+    start, end (비디오 내 초), min_confidence, chunk_size
+    """
+    fmt = args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return {"status": "error", "message": f"Unsupported format: {fmt}. Choose from {', '.join(EXPORT_FORMATS)}."}, 400
+    if fmt == "parquet" and pa is None:
+        return {"status": "error", "message": "Parquet export requires pyarrow."}, 400
+
+    try:
+        filters = {
+            "video_ids": [int(video_id) for video_id in args.getlist("video_id")],
+            "since": _parse_time(args.get("since")),
+            "until": _parse_time(args.get("until")),
+            "start": float(args["start"]) if args.get("start") else None,
+            "end": float(args["end"]) if args.get("end") else None,
+            "min_confidence": float(args["min_confidence"]) if args.get("min_confidence") else None,
+        }
+        chunk_size = max(1, int(args.get("chunk_size", EXPORT_CHUNK_SIZE)))
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid export parameter: {str(e)}"}, 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return {
+        "chunks": result_exporter.export(fmt, chunk_size=chunk_size, **filters),
+        "mimetype": mimetype,
+        "filename": f"str_results.{extension}"
+    }, 200
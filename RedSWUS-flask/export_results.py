@@ -0,0 +1,54 @@
+# export_results.py
+# 인식 결과 내보내기 CLI (모델을 로드하지 않고 DB 만 연결)
+# 사용 예:
+#   python export_results.py --format csv --video-id 3 --video-id 4 --output results.csv
+#   python export_results.py --format parquet --since 2024-05-01 --until 2024-06-01 --min-confidence 0.8 -o may.parquet
+#   python export_results.py --start 60 --end 120 | head
+import argparse
+import sys
+from datetime import datetime
+from flask import Flask
+from models import db
+from db_config import configure_database, DATABASE_URL
+from export_handlers import result_exporter, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, pa
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Export recognition results")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--video-id", type=int, action="append", dest="video_ids", help="repeatable")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="video upload time >= (ISO)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="video upload time < (ISO)")
+    parser.add_argument("--start", type=float, help="position in video >= seconds")
+    parser.add_argument("--end", type=float, help="position in video < seconds")
+    parser.add_argument("--min-confidence", type=float)
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    if args.format == "parquet" and pa is None:
+        sys.exit("Parquet export requires pyarrow.")
+    if args.format == "parquet" and not args.output:
+        sys.exit("Parquet export needs --output.")
+
+    app = Flask(__name__)
+    configure_database(app, args.database_url)
+    db.init_app(app)
+
+    with app.app_context():
+        chunks = result_exporter.export(
+            args.format, chunk_size=max(1, args.chunk_size), video_ids=args.video_ids,
+            since=args.since, until=args.until, start=args.start, end=args.end,
+            min_confidence=args.min_confidence
+        )
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
@@ -1,8 +1,12 @@
 # firstPrepro_handlers.py
 import os
 import cv2
-from flask import request, jsonify
-from models import db, FirstPreprocessingResult, YoloResult
+from flask import jsonify
+from models import FirstPreprocessingResult, YoloResult
+from quality_router import quality_router
+from persistence import write_behind
+from frame_source import frame_index_from_name
+from yolo_handlers import unpad_image
 
 # 1차 전처리 함수
 def preprocess_image(image):
@@ -31,7 +35,35 @@ class FirstPreproApp:
         self.output_folder = output_folder
         os.makedirs(self.output_folder, exist_ok=True)
 
-    def process_first_prepro(self, yolo_result_code):
+    def output_path(self, yolo_result_code, filename):
+        return os.path.join(self.output_folder, f"first_prepro_{yolo_result_code}_{filename}")
+
+    def process_image(self, yolo_result, filename, image):
+        """
+        이미지 한 장을 전처리해서 저장한다.
+        (결과 경로, first_result_code Future, 전처리된 이미지) 를 반환한다.
+        """
+        # 이미지 전처리 (선명하고 밝기가 적당한 이미지는 생략, 화질은 패딩을 뺀 크롭으로 판단)
+        if quality_router.needs_first_prepro(unpad_image(image)):
+            processed_image = preprocess_image(image)
+        else:
+            processed_image = image
+
+        # 결과 저장
+        output_path = self.output_path(yolo_result.yolo_result_code, filename)
+        cv2.imwrite(output_path, processed_image)
+
+        # 데이터베이스에 1차 전처리 결과 저장 (write-behind)
+        future = write_behind.add(
+            FirstPreprocessingResult,
+            video_code=yolo_result.video_code,
+            yolo_result_code=yolo_result.yolo_result_code,
+            first_result_path=output_path,
+            frame_index=frame_index_from_name(filename)
+        )
+        return output_path, future, processed_image
+
+    def process_first_prepro(self, yolo_result_code, cancel_token=None):
 
         # YOLO 결과 코드로 이미지 경로 확인
         yolo_result = YoloResult.query.filter_by(yolo_result_code=yolo_result_code).first()
@@ -46,10 +78,24 @@ class FirstPreproApp:
         # 모든 이미지 파일 처리
         processed_paths = []
         first_code_list = []
-        for filename in os.listdir(image_folder):
+        # 이미 처리된 파일은 건너뜀 (작업 재개 시 멱등성 보장)
+        done_paths = {
+            result.first_result_path: result.first_result_code
+            for result in FirstPreprocessingResult.query.filter_by(yolo_result_code=yolo_result_code).all()
+        }
+        for entry in os.scandir(image_folder):
+            filename = entry.name
             if filename.endswith(('.jpg', '.jpeg', '.png')):  # 지원되는 이미지 확장자만 처리
-                image_path = os.path.join(image_folder, filename)
+                image_path = entry.path
+                output_path = self.output_path(yolo_result_code, filename)
+                if output_path in done_paths:
+                    processed_paths.append(output_path)
+                    first_code_list.append(done_paths[output_path])
+                    continue
 
+                # 이미지 사이마다 취소/제한 시간 확인
+                if cancel_token is not None:
+                    cancel_token.check()
                 print(image_path)
                 
                 # 이미지 열기
@@ -58,25 +104,12 @@ class FirstPreproApp:
                     print(f"Failed to load image at path: {image_path}. Skipping.")
                     continue
 
-                # 이미지 전처리
-                processed_image = preprocess_image(image)
-
-                # 결과 저장 경로 설정
-                output_filename = f"first_prepro_{yolo_result_code}_{filename}"
-                output_path = os.path.join(self.output_folder, output_filename)
-                cv2.imwrite(output_path, processed_image)
+                # 전처리 후 저장 (코드는 마지막에 한꺼번에 받음)
+                output_path, future, _ = self.process_image(yolo_result, filename, image)
                 processed_paths.append(output_path)
+                first_code_list.append(future)
 
-                # 데이터베이스에 1차 전처리 결과 저장 (옵션)
-                first_prepro_result = FirstPreprocessingResult(
-                    video_code=yolo_result.video_code,
-                    yolo_result_code=yolo_result_code,
-                    first_result_path=output_path
-                )
-                db.session.add(first_prepro_result)
-                db.session.commit()
-
-                first_code_list.append(first_prepro_result.first_result_code)
+        first_code_list = [code if isinstance(code, int) else code.result() for code in first_code_list]
 
         if not processed_paths:
             return {"status": "error", "message": "No valid images found in the folder."}, 404
@@ -85,7 +118,7 @@ class FirstPreproApp:
             "status": "success",
             "message": "First preprocessing completed successfully for all images.",
             "processed_files": processed_paths,
-            "std_result_code": first_prepro_result.first_result_code,
+            "std_result_code": first_code_list[-1],
             "first_code_list": first_code_list
         }, 200
 
@@ -0,0 +1,231 @@
+# frame_source.py
+# 건너뛸 프레임은 디코딩하지 않는 비디오 프레임 추출기 (탐지 단계 입력용)
+import os
+import re
+import time
+import cv2
+
+try:
+    import av  # PyAV: 키프레임 전용 디코딩과 seek 지원
+except ImportError:
+    av = None
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.wmv')
+
+
+class FrameSource:
+    """
+    비디오에서 필요한 프레임만 뽑아내는 이터레이터.
+
+    - stride: N 프레임마다 1장 (기존 --vid-stride 와 동일)
+    - sample_fps: 초당 N 장 (시간 기준 샘플링, stride 보다 우선)
+    - keyframes_only: 키프레임만 디코딩하는 빠른 모드
+    - start_time / end_time: 이 구간(초)만 처리 (구간 분할 처리용)
+
+    PyAV 가 있으면 키프레임 전용 디코딩과 seek 를 사용하고,
+    없으면 OpenCV grab()/retrieve() 로 건너뛸 프레임의 색 변환/복사를 생략한다.
+    샘플 간격이 GOP 보다 길면 다음 샘플 위치로 seek 한다.
+    """
+
+    # 키프레임 간격(GOP, 프레임 수). 0 이면 PyAV 는 디코딩하면서 측정하고,
+    # 키프레임 정보를 알 수 없는 OpenCV 는 DEFAULT_GOP_FRAMES (x264 기본 keyint) 로 가정한다.
+    GOP_FRAMES = int(os.environ.get("REDSWUS_GOP_FRAMES", "0"))
+    DEFAULT_GOP_FRAMES = 250
+
+    def __init__(self, video_path, stride=1, sample_fps=None, keyframes_only=False,
+                 start_time=None, end_time=None, gop_frames=None):
+        self.video_path = video_path
+        self.stride = max(1, int(stride))
+        self.sample_fps = sample_fps
+        self.keyframes_only = keyframes_only
+        self.start_time = start_time or 0.0
+        self.end_time = end_time
+        self.gop_frames = self.GOP_FRAMES if gop_frames is None else int(gop_frames)
+        self.fps = None
+        self.gop = None
+
+        # 통계
+        self.decoded = 0
+        self.emitted = 0
+        self.seeks = 0
+        self.decode_time = 0.0
+        self._decoder = None
+
+    def __iter__(self):
+        """(frame_index, timestamp_sec, BGR 이미지) 를 순서대로 반환한다."""
+        if av is not None:
+            return self._iter_av()
+        return self._iter_cv2()
+
+    def _wanted(self, index, timestamp, next_time):
+        # 샘플링 규칙에 맞는 프레임인지 판단
+        if self.sample_fps:
+            return timestamp >= next_time
+        return index % self.stride == 0
+
+    def _step(self, fps):
+        # 샘플 사이 간격 (프레임 수)
+        return fps / self.sample_fps if self.sample_fps else self.stride
+
+    def _should_seek(self, fps):
+        # 샘플 간격이 GOP 보다 길 때만 seek 가 순차 디코딩보다 빠름
+        # (seek 는 직전 키프레임부터 다시 디코딩하므로 GOP 안에서는 이득이 없음)
+        return not self.keyframes_only and bool(self.gop) and self._step(fps) > self.gop
+
+    def _iter_av(self):
+        container = av.open(self.video_path)
+        try:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            if self.keyframes_only:
+                stream.codec_context.skip_frame = "NONKEY"
+
+            fps = self.fps = float(stream.average_rate or 30)
+            interval = 1.0 / self.sample_fps if self.sample_fps else None
+            next_time = self.start_time
+            self.gop = self.gop_frames or None
+            last_key = None
+            last_index = -1
+            self._decoder = None
+            # 첫 프레임 PTS 가 0 이 아닌 비디오도 프레임 번호가 0 부터 시작하도록 (OpenCV CAP_PROP_POS_FRAMES 와 일치)
+            offset = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+            if self.start_time:
+                container.seek(int((self.start_time + offset) / stream.time_base), stream=stream, backward=True)
+
+            while True:
+                start = time.perf_counter()
+                frame = self._next_av_frame(container, stream)
+                self.decode_time += time.perf_counter() - start
+                if frame is None:
+                    break
+                self.decoded += 1
+
+                timestamp = float(frame.time) - offset if frame.time is not None else (self.decoded - 1) / fps
+                index = int(round(timestamp * fps))
+                if frame.key_frame:
+                    # 연속된 두 키프레임 사이 간격 중 가장 긴 값을 GOP 로 사용
+                    if not self.gop_frames and last_key is not None and index > last_key:
+                        self.gop = max(self.gop or 0, index - last_key)
+                    last_key = index
+                if timestamp < self.start_time or index <= last_index:
+                    continue
+                if self.end_time is not None and timestamp >= self.end_time:
+                    break
+                if self.keyframes_only or self._wanted(index, timestamp, next_time):
+                    self.emitted += 1
+                    last_index = index
+                    yield index, timestamp, frame.to_ndarray(format="bgr24")
+                    if interval:
+                        next_time = timestamp + interval
+                    # 다음 샘플이 GOP 보다 멀면 해당 위치 직전 키프레임으로 seek
+                    if self._should_seek(fps):
+                        target = next_time if interval else (index + self.stride) / fps
+                        container.seek(int((target + offset) / stream.time_base), stream=stream, backward=True)
+                        self._decoder = None
+                        self.seeks += 1
+                        last_key = None
+        finally:
+            container.close()
+
+    def _next_av_frame(self, container, stream):
+        # seek 후에는 디코더 이터레이터를 다시 만들어야 함
+        if self._decoder is None:
+            self._decoder = container.decode(stream)
+        return next(self._decoder, None)
+
+    def _iter_cv2(self):
+        capture = cv2.VideoCapture(self.video_path)
+        try:
+            fps = self.fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            interval = 1.0 / self.sample_fps if self.sample_fps else None
+            next_time = self.start_time
+            self.gop = self.gop_frames or self.DEFAULT_GOP_FRAMES
+            index = int(round(self.start_time * fps))
+            if index:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+            while True:
+                start = time.perf_counter()
+                # grab() 은 프레임을 읽기만 하고 BGR 변환/복사는 retrieve() 에서만 수행
+                if not capture.grab():
+                    self.decode_time += time.perf_counter() - start
+                    break
+                self.decoded += 1
+                timestamp = index / fps
+                if self.end_time is not None and timestamp >= self.end_time:
+                    self.decode_time += time.perf_counter() - start
+                    break
+
+                if self._wanted(index, timestamp, next_time):
+                    ok, image = capture.retrieve()
+                    self.decode_time += time.perf_counter() - start
+                    if ok:
+                        self.emitted += 1
+                        yield index, timestamp, image
+                        if interval:
+                            next_time = timestamp + interval
+                        # 다음 샘플이 GOP 보다 멀면 프레임 위치로 바로 이동
+                        if self._should_seek(fps):
+                            index = int(round(next_time * fps)) if interval else index + self.stride
+                            capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                            self.seeks += 1
+                            continue
+                else:
+                    self.decode_time += time.perf_counter() - start
+                index += 1
+        finally:
+            capture.release()
+
+    def stats(self):
+        return {
+            "backend": "pyav" if av is not None else "opencv",
+            "fps": self.fps,
+            "decoded_frames": self.decoded,
+            "emitted_frames": self.emitted,
+            "gop_frames": self.gop,
+            "seeks": self.seeks,
+            "decode_seconds": round(self.decode_time, 3),
+            "decode_fps": round(self.decoded / self.decode_time, 2) if self.decode_time else 0.0,
+        }
+
+
+def probe_video(video_path):
+    """(길이(초), fps) 를 반환한다."""
+    capture = cv2.VideoCapture(video_path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        return frame_count / fps, fps
+    finally:
+        capture.release()
+
+
+def read_frame(video_path, frame_index):
+    """프레임 한 장만 seek 해서 읽는다 (없으면 None)."""
+    capture = cv2.VideoCapture(video_path)
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ok, frame = capture.read()
+        return frame if ok else None
+    finally:
+        capture.release()
+
+
+# 크롭 파일명 (<비디오 이름>_<7자리 프레임 번호><순번>.jpg) 의 프레임 번호 (detect.py 가 같은 프레임의 크롭에 붙이는 번호 2, 3.. 는 무시)
+_FRAME_INDEX_PATTERN = re.compile(r"_(\d{7})(\d*)\.\w+$")
+
+
+def frame_index_from_name(filename):
+    match = _FRAME_INDEX_PATTERN.search(filename)
+    return int(match.group(1)) if match else None
+
+
+def crop_ordinal_from_name(filename):
+    """
+    같은 프레임에서 나온 크롭 중 몇 번째인지 (0부터).
+    detect.py 는 <프레임>.jpg, <프레임>2.jpg, <프레임>3.jpg ... 순서로 저장한다.
+    """
+    match = _FRAME_INDEX_PATTERN.search(filename)
+    if not match:
+        return None
+    return int(match.group(2)) - 1 if match.group(2) else 0
@@ -0,0 +1,110 @@
+# inference_scheduler.py
+# 여러 요청에서 들어온 입력을 모아 한 번에 추론하는 마이크로 배치 스케줄러
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """
+    모델 하나당 하나씩 두는 스레드 안전 배치 스케줄러.
+    submit()으로 넣은 입력은 전용 워커 스레드가 max_batch_size 개까지,
+    또는 첫 입력 이후 max_wait 초가 지날 때까지 모아서 batch_fn 으로 한 번에 실행한다.
+    모델은 워커 스레드에서만 호출되므로 별도의 락이 필요 없다.
+    flush_when_idle 이면 기다리지 않고 이미 큐에 쌓인 입력만 모아 바로 실행한다
+    (DB 쓰기처럼 한 번 실행이 짧고, 실행 중에 쌓인 입력이 자연스럽게 다음 배치가 되는 경우).
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait=0.01, name="batch-scheduler", flush_when_idle=False):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self.name = name
+        self.flush_when_idle = flush_when_idle
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        # 진단용 카운터
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def submit(self, item):
+        """입력 하나를 큐에 넣고 결과를 받을 Future 를 반환한다."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        # 동기 호출용 단축 메서드
+        return self.submit(item).result()
+
+    def _collect(self):
+        # 첫 입력은 블로킹으로 기다리고, 나머지는 마감 시간까지만 모은다
+        batch = [self._queue.get()]
+        if self.flush_when_idle:
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 이미 취소된 요청은 추론에서 제외
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.batch_fn(items))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                # batch_fn 이 항목별 실패를 예외 객체로 돌려준 경우
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            # batch_fn 이 입력보다 적은 결과를 돌려주면 남은 Future 가 영원히 대기하지 않도록 실패 처리
+            if len(results) < len(batch):
+                error = RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} inputs")
+                for _, future in batch[len(results):]:
+                    future.set_exception(error)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,252 @@
+# job_handlers.py
+# 단계별 체크포인트를 남기며 파이프라인을 실행하고, 실패한 작업을 이어서 실행하는 핸들러
+import os
+from datetime import datetime
+from models import db, Job, JobCheckpoint, Video, StrResult
+from yolo_handlers import yolo_app, VIDEO_EXTENSIONS
+from firstPrepro_handlers import first_prepro_app
+from std_handlers import detectron_handler
+from secondPrepro_handlers import second_prepro_app
+from str_handlers import str_app
+from persistence import write_behind
+from cancellation import CancelToken, JobCancelled, DeadlineExceeded, cancel_registry
+
+# 파이프라인 단계 (실행 순서)
+STAGES = ("yolo", "first_prepro", "std", "second_prepro", "str")
+
+
+class StageError(Exception):
+    """단계 처리 실패 (응답 본문과 상태 코드를 함께 전달)."""
+
+    def __init__(self, body, status_code):
+        super().__init__(body.get("message") or body.get("error"))
+        self.body = body
+        self.status_code = status_code
+
+
+def _body(response):
+    # 핸들러가 dict 또는 jsonify Response 를 반환하므로 dict 로 통일
+    body = response[0]
+    return body.get_json() if hasattr(body, "get_json") else body
+
+
+def _check(response):
+    if response[1] != 200:
+        raise StageError(_body(response), response[1])
+    return _body(response)
+
+
+# Job 관련 클래스
+class JobAPP:
+    def create_job(self, video_code):
+        now = datetime.utcnow()
+        job = Job(video_code=video_code, status='running', created_time=now, updated_time=now)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def get_job(self, job_id):
+        return Job.query.filter_by(job_id=job_id).first()
+
+    def _update_job(self, job, **fields):
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_time = datetime.utcnow()
+        db.session.commit()
+
+    def _run_items(self, job, stage, input_codes, process, cancel_token):
+        """
+        입력 코드마다 process(input_code) -> 출력 코드 리스트 를 실행한다.
+        체크포인트가 있는 입력은 다시 실행하지 않고 기록된 출력 코드를 재사용한다.
+        항목 사이마다 취소/제한 시간을 확인한다.
+        """
+        self._update_job(job, current_stage=stage)
+        cancel_token.start_stage(stage)
+        checkpoints = {
+            checkpoint.input_code: checkpoint
+            for checkpoint in JobCheckpoint.query.filter_by(job_id=job.job_id, stage=stage).all()
+        }
+
+        output_codes = []
+        pending_checkpoints = []
+        try:
+            for input_code in input_codes:
+                checkpoint = checkpoints.get(input_code)
+                if checkpoint:
+                    output_codes.extend(int(code) for code in checkpoint.output_codes.split(',') if code)
+                    continue
+
+                cancel_token.check()
+                codes = process(input_code)
+                # 체크포인트는 write-behind 로 저장하고 단계가 끝날 때 한 번에 확인
+                pending_checkpoints.append(write_behind.add(
+                    JobCheckpoint,
+                    job_id=job.job_id,
+                    stage=stage,
+                    input_code=input_code,
+                    output_codes=','.join(str(code) for code in codes),
+                    completed_time=datetime.utcnow()
+                ))
+                output_codes.extend(codes)
+        finally:
+            # 실패하더라도 그때까지 완료된 항목의 체크포인트는 남김
+            for future in pending_checkpoints:
+                future.exception()
+        return output_codes
+
+    def run(self, job_id, cancel_token=None):
+        job = self.get_job(job_id)
+        if not job:
+            return {"status": "error", "message": f"Job with ID {job_id} not found."}, 404
+        if job.status == 'completed':
+            return self._completed_response(job)
+
+        cancel_token = cancel_token or CancelToken()
+        if not cancel_registry.register(job_id, cancel_token):
+            return {"status": "error", "message": f"Job with ID {job_id} is already running.", "job_id": job_id}, 409
+        try:
+            return self._run(job, cancel_token)
+        finally:
+            cancel_registry.unregister(job_id)
+
+    def _run(self, job, cancel_token):
+        video = Video.query.filter_by(video_code=job.video_code).first()
+        self._update_job(job, status='running', error_message=None)
+        # 이번 실행에서 YOLO 단계를 실행했으면 프레임 통계를 응답에 포함 (체크포인트로 건너뛰면 없음)
+        frame_stats = {}
+
+        def run_yolo(_):
+            if not video.video_path.endswith(VIDEO_EXTENSIONS):
+                raise StageError({"message": "Unsupported file format. Only MP4, AVI, MKV, MOV, WMV are supported."}, 400)
+            body = _check(yolo_app.process_video(video.video_code, video.video_path, cancel_token=cancel_token))
+            frame_stats.update(body.get("frame_stats") or {})
+            return [body["yolo_result_code"]]
+
+        def run_first_prepro(yolo_result_code):
+            return _check(first_prepro_app.process_first_prepro(yolo_result_code, cancel_token=cancel_token))["first_code_list"]
+
+        def run_std(first_result_code):
+            std_response = detectron_handler.handle_std_predict(first_result_code, cancel_token=cancel_token)
+            if std_response == 0:
+                return []
+            return _check(std_response)["std_result_codes"]
+
+        def run_second_prepro(std_result_code):
+            # 단계별 체크포인트 순서상 STD 크롭은 비디오 전체가 끝난 뒤 처리되므로 메모리에 모아 두지 않고 파일에서 읽음
+            body = _check(second_prepro_app.process_images(std_result_code))
+            return [body["second_code_number"]]
+
+        def run_str(second_result_code):
+            return [_check(str_app.process_str(second_result_code, cancel_token=cancel_token))["str_result_code"]]
+
+        try:
+            yolo_codes = self._run_items(job, "yolo", [0], run_yolo, cancel_token)
+            first_codes = self._run_items(job, "first_prepro", yolo_codes, run_first_prepro, cancel_token)
+            std_codes = self._run_items(job, "std", first_codes, run_std, cancel_token)
+            second_codes = self._run_items(job, "second_prepro", std_codes, run_second_prepro, cancel_token)
+            self._run_items(job, "str", second_codes, run_str, cancel_token)
+        except DeadlineExceeded as e:
+            db.session.rollback()
+            self._update_job(job, status='failed', error_message=str(e))
+            return {"status": "error", "message": str(e), "job_id": job.job_id, "stage": job.current_stage}, 504
+        except JobCancelled as e:
+            # 완료된 항목의 체크포인트는 남아 있으므로 /jobs/<id>/resume 으로 이어서 실행 가능
+            db.session.rollback()
+            self._update_job(job, status='cancelled', error_message=str(e))
+            return {"status": "cancelled", "message": str(e), "job_id": job.job_id, "stage": job.current_stage}, 409
+        except StageError as e:
+            db.session.rollback()
+            self._update_job(job, status='failed', error_message=str(e))
+            body = dict(e.body, job_id=job.job_id, stage=job.current_stage)
+            return body, e.status_code
+        except Exception as e:
+            db.session.rollback()
+            self._update_job(job, status='failed', error_message=str(e))
+            return {
+                "status": "error",
+                "message": f"An error occurred during full pipeline execution: {str(e)}",
+                "job_id": job.job_id,
+                "stage": job.current_stage
+            }, 500
+
+        self._update_job(job, status='completed', current_stage=None)
+        body, status_code = self._completed_response(job)
+        if frame_stats:
+            body["frame_stats"] = frame_stats
+        return body, status_code
+
+    def _completed_response(self, job):
+        # STR 체크포인트 순서대로 결과 텍스트를 모음
+        str_codes = []
+        for checkpoint in JobCheckpoint.query.filter_by(job_id=job.job_id, stage="str").order_by(JobCheckpoint.checkpoint_code).all():
+            str_codes.extend(int(code) for code in checkpoint.output_codes.split(',') if code)
+
+        # 결과 텍스트는 DB 의 StrResult.text 에서 한 번에 조회 (text 컬럼 추가 전 행만 결과 파일을 읽음)
+        str_results = {
+            str_result.str_result_code: str_result
+            for str_result in StrResult.query.filter(StrResult.str_result_code.in_(str_codes)).all()
+        } if str_codes else {}
+        text_results = []
+        for str_result_code in str_codes:
+            str_result = str_results.get(str_result_code)
+            if str_result is None:
+                continue
+            if str_result.text is not None:
+                text_results.append(str_result.text)
+            elif os.path.exists(str_result.str_result_path):
+                with open(str_result.str_result_path) as f:
+                    text_results.append(f.read())
+
+        return {
+            "status": "success",
+            "message": "Full pipeline completed successfully.",
+            "job_id": job.job_id,
+            "str_result": text_results
+        }, 200
+
+    def cancel(self, job_id):
+        job = self.get_job(job_id)
+        if not job:
+            return {"status": "error", "message": f"Job with ID {job_id} not found."}, 404
+        if cancel_registry.cancel(job_id):
+            # 실행 중인 작업은 다음 확인 지점에서 멈춤
+            return {"status": "cancelling", "job_id": job_id}, 202
+        if job.status == 'running':
+            # 실행 중인 프로세스가 없는데 running 으로 남은 작업 (서버 재시작 등)
+            self._update_job(job, status='cancelled', error_message="Job cancelled by request.")
+            return {"status": "cancelled", "job_id": job_id}, 200
+        return {"status": "error", "message": f"Job with ID {job_id} is not running (status: {job.status}).",
+                "job_id": job_id}, 409
+
+    def status(self, job_id):
+        job = self.get_job(job_id)
+        if not job:
+            return {"status": "error", "message": f"Job with ID {job_id} not found."}, 404
+        completed = {stage: 0 for stage in STAGES}
+        for checkpoint in job.checkpoints:
+            completed[checkpoint.stage] += 1
+        return {
+            "job_id": job.job_id,
+            "video_id": job.video_code,
+            "status": job.status,
+            "current_stage": job.current_stage,
+            "error_message": job.error_message,
+            "completed_items": completed
+        }, 200
+
+# JobAPP 인스턴스 생성
+job_app = JobAPP()
+
+# 핸들러 함수
+def handle_run_job(video_id, cancel_token=None):
+    job = job_app.create_job(video_id)
+    return job_app.run(job.job_id, cancel_token=cancel_token)
+
+def handle_resume_job(job_id, cancel_token=None):
+    return job_app.run(job_id, cancel_token=cancel_token)
+
+def handle_cancel_job(job_id):
+    return job_app.cancel(job_id)
+
+def handle_job_status(job_id):
+    return job_app.status(job_id)
@@ -0,0 +1,301 @@
+# live_stream.py
+# RTSP/HTTP 카메라 또는 비디오 파일(실시간 속도 재생)을 계속 처리하며 인식 결과를 SSE 구독자에게 전달
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+import cv2
+import numpy as np
+from PIL import Image
+from firstPrepro_handlers import preprocess_image
+from quality_router import quality_router
+from yolo_handlers import yolo_app, pad_image
+from std_handlers import detectron_handler
+from secondPrepro_handlers import second_prepro_app
+from str_handlers import str_app
+from video_handlers import video_app
+from frame_source import VIDEO_EXTENSIONS
+
+# 프레임 캡처 ~ 결과 전송까지의 목표 지연 시간, 처리 대기 창 크기
+LATENCY_SLO = float(os.environ.get("REDSWUS_LIVE_LATENCY_SLO_MS", "2000")) / 1000.0
+WINDOW_SIZE = int(os.environ.get("REDSWUS_LIVE_WINDOW", "4"))
+SUBSCRIBER_QUEUE_SIZE = 100
+# 종료된 스트림의 지표를 조회할 수 있도록 관리 목록에 남겨두는 시간 (초)
+FINISHED_TTL = float(os.environ.get("REDSWUS_LIVE_FINISHED_TTL", "300"))
+
+
+def _env_list(name, default=""):
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+# 클라이언트가 보낸 source 를 그대로 cv2.VideoCapture 에 넘기지 않도록 허용 목록으로 제한
+# - REDSWUS_LIVE_SOURCES: 등록된 카메라 주소 (쉼표 구분, 정확히 일치해야 함)
+# - REDSWUS_LIVE_SCHEMES + REDSWUS_LIVE_HOSTS: 허용 스킴과 호스트 조합 (호스트 목록이 비어 있으면 사용 안 함)
+# 파일 재생(replay)은 업로드 폴더 안의 비디오 파일만 허용
+LIVE_SOURCES = _env_list("REDSWUS_LIVE_SOURCES")
+LIVE_SCHEMES = [scheme.lower() for scheme in _env_list("REDSWUS_LIVE_SCHEMES", "rtsp,rtsps")]
+LIVE_HOSTS = [host.lower() for host in _env_list("REDSWUS_LIVE_HOSTS")]
+
+
+def check_source(source, replay=False):
+    """허용되지 않은 소스면 거부 사유를, 허용되면 None 을 반환한다."""
+    if not isinstance(source, str) or not source:
+        return "source is required."
+    if source in LIVE_SOURCES:
+        return None
+    if replay:
+        # 업로드 폴더 기준 파일명 또는 업로드 폴더 안을 가리키는 경로 (심볼릭 링크/.. 는 실제 경로로 확인)
+        upload_folder = os.path.realpath(video_app.upload_folder)
+        for path in (os.path.realpath(os.path.join(upload_folder, source)), os.path.realpath(source)):
+            if (os.path.commonpath([upload_folder, path]) == upload_folder and os.path.isfile(path)
+                    and os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS):
+                return None
+        return "replay source must be an uploaded video file."
+    try:
+        url = urlsplit(source)
+        host = (url.hostname or "").lower()
+    except ValueError:
+        return "source is not a valid URL."
+    if url.scheme.lower() not in LIVE_SCHEMES or not host or host not in LIVE_HOSTS:
+        return "source is not an allowed stream URL."
+    return None
+
+
+class LiveStream:
+    """
+    캡처 스레드는 최신 프레임 window_size 장만 유지하고 (넘치면 가장 오래된 프레임을 버림),
+    처리 스레드는 창에서 프레임을 꺼내 YOLO -> 1차 전처리 -> STD -> 2차 전처리 -> STR 을 수행한다.
+    꺼낸 프레임이 이미 latency_slo 보다 오래됐으면 처리하지 않고 버린다.
+    """
+
+    def __init__(self, stream_id, source, replay=False, sample_fps=None,
+                 latency_slo=LATENCY_SLO, window_size=WINDOW_SIZE):
+        self.stream_id = stream_id
+        self.source = source
+        self.replay = replay
+        self.sample_fps = sample_fps
+        self.latency_slo = latency_slo
+        self._window = deque(maxlen=max(1, window_size))
+        self._window_lock = threading.Condition()
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._source_ended = False
+        self.stopped_time = None
+        self._latencies = deque(maxlen=1000)
+        self._threads = [
+            threading.Thread(target=self._capture, name=f"live-{stream_id}-capture", daemon=True),
+            threading.Thread(target=self._process, name=f"live-{stream_id}-process", daemon=True),
+        ]
+
+        # 지표
+        self.started_time = None
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0  # 처리가 밀려 창에서 밀려난 프레임
+        self.frames_stale = 0  # 꺼냈을 때 이미 SLO 를 넘긴 프레임
+        self.slo_violations = 0
+        self.texts_published = 0
+        self.subscriber_drops = 0
+        self.error = None
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def start(self):
+        self.started_time = time.time()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        if self.stopped_time is None:
+            self.stopped_time = time.time()
+        self._stop_event.set()
+        with self._window_lock:
+            self._window_lock.notify_all()
+        self._publish(None)  # 구독자에게 종료 알림
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _publish(self, event):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # 느린 구독자 때문에 처리 스레드가 멈추지 않도록 버림
+                self.subscriber_drops += 1
+
+    def _capture(self):
+        capture = cv2.VideoCapture(self.source)
+        try:
+            if not capture.isOpened():
+                self.error = f"Failed to open source: {self.source}"
+                return
+            fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            interval = 1.0 / self.sample_fps if self.sample_fps else None
+            next_time = 0.0
+            start = time.monotonic()
+            index = 0
+            while self.running:
+                if not capture.grab():
+                    break
+                timestamp = index / fps
+                index += 1
+                if self.replay:
+                    # 파일 재생: 실제 카메라처럼 프레임 시각에 맞춰 대기
+                    delay = start + timestamp - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if interval and timestamp < next_time:
+                    continue
+                next_time = timestamp + (interval or 0)
+
+                ok, frame = capture.retrieve()
+                if not ok:
+                    continue
+                self.frames_captured += 1
+                with self._window_lock:
+                    if len(self._window) == self._window.maxlen:
+                        self.frames_dropped += 1
+                    self._window.append((time.monotonic(), index - 1, timestamp, frame))
+                    self._window_lock.notify()
+        finally:
+            capture.release()
+            with self._window_lock:
+                self._source_ended = True
+                self._window_lock.notify_all()
+
+    def _next_frame(self):
+        with self._window_lock:
+            while not self._window:
+                if self._source_ended or not self.running:
+                    return None
+                self._window_lock.wait(timeout=0.5)
+            return self._window.popleft()
+
+    def _process(self):
+        try:
+            while self.running:
+                item = self._next_frame()
+                if item is None:
+                    break
+                captured_at, frame_index, timestamp, frame = item
+                if time.monotonic() - captured_at > self.latency_slo:
+                    self.frames_stale += 1
+                    continue
+
+                texts = self.recognize(frame)
+                latency = time.monotonic() - captured_at
+                self.frames_processed += 1
+                self._latencies.append(latency)
+                if latency > self.latency_slo:
+                    self.slo_violations += 1
+                if texts:
+                    self.texts_published += len(texts)
+                    self._publish({
+                        "stream_id": self.stream_id,
+                        "frame_index": frame_index,
+                        "timestamp": round(timestamp, 3),
+                        "latency_ms": round(latency * 1000, 1),
+                        "texts": texts
+                    })
+        except Exception as e:
+            self.error = str(e)
+            print(f"실시간 스트림 {self.stream_id} 처리 중 오류 발생: {e}")
+        finally:
+            self.stop()
+
+    @staticmethod
+    def recognize(frame):
+        """프레임 한 장을 DB 기록 없이 전체 단계로 처리해 인식 결과 리스트를 반환한다."""
+        texts = []
+        for crop in yolo_app.detect_frame(frame):
+            padded = pad_image(crop)
+            first = preprocess_image(padded) if quality_router.needs_first_prepro(crop) else padded
+            img = cv2.cvtColor(first, cv2.COLOR_GRAY2BGR) if first.ndim == 2 else first
+
+            boxes, classes, scores = detectron_handler.detect(img)
+            for (_, _, text_crop), score in zip(detectron_handler.crop_boxes(img, boxes, classes), scores):
+                if not quality_router.keep_crop(text_crop, score):
+                    continue
+                second = second_prepro_app.apply(text_crop[..., 2::-1])
+                result = str_app.STRpredict(Image.fromarray(second))
+                texts.append({"text": result["text"], "confidence": result["confidence"]})
+        return texts
+
+    def metrics(self):
+        latencies = np.array(self._latencies) * 1000 if self._latencies else None
+        return {
+            "stream_id": self.stream_id,
+            "source": self.source,
+            "running": self.running,
+            "error": self.error,
+            "latency_slo_ms": self.latency_slo * 1000,
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "frames_stale": self.frames_stale,
+            "slo_violations": self.slo_violations,
+            "texts_published": self.texts_published,
+            "subscribers": len(self._subscribers),
+            "subscriber_drops": self.subscriber_drops,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 1),
+                "p95": round(float(np.percentile(latencies, 95)), 1),
+                "max": round(float(latencies.max()), 1),
+            } if latencies is not None else None,
+        }
+
+
+# 실시간 스트림 관리 클래스
+class LiveStreamManager:
+    def __init__(self):
+        self._streams = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, source, replay=False, sample_fps=None):
+        with self._lock:
+            self._prune()
+            stream_id = next(self._ids)
+            stream = LiveStream(stream_id, source, replay=replay, sample_fps=sample_fps)
+            self._streams[stream_id] = stream
+        return stream.start()
+
+    def get(self, stream_id):
+        with self._lock:
+            self._prune()
+            return self._streams.get(stream_id)
+
+    def stop(self, stream_id):
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream:
+            stream.stop()
+        return stream
+
+    def _prune(self):
+        # 소스가 끝나거나 오류로 멈춘 스트림은 FINISHED_TTL 이 지나면 목록에서 제거 (호출자가 _lock 보유)
+        now = time.time()
+        for stream_id, stream in list(self._streams.items()):
+            if stream.stopped_time is not None and now - stream.stopped_time > FINISHED_TTL:
+                del self._streams[stream_id]
+
+# LiveStreamManager 인스턴스 생성
+live_manager = LiveStreamManager()
@@ -1,16 +1,13 @@
 #model_detection.py
 import argparse
 import glob
-import multiprocessing as mp
 import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cv2
-import tqdm
-import numpy as np
 
 from detectron2.config import get_cfg
-from detectron2.data.detection_utils import read_image
-from detectron2.utils.logger import setup_logger
 
 from predictor import VisualizationDemo
 
@@ -71,6 +68,23 @@ def get_parser():
         default=0.5,
         help="Minimum score for instance predictions to be shown",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=4,
+        help="number of images per inference batch",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="threads used to prefetch (decode) input images",
+    )
+    parser.add_argument(
+        "--no-vis",
+        action="store_true",
+        help="skip rendering and saving visualizations (txt results only)",
+    )
     parser.add_argument(
         "--opts",
         help="Modify config options using the command-line 'KEY VALUE' pairs",
@@ -82,20 +96,64 @@ def get_parser():
 
 def save_result_to_txt(txt_save_path,prediction,polygons):
 
-    file = open(txt_save_path,'w')
-    classes = prediction['instances'].pred_classes
-    boxes = prediction['instances'].pred_boxes.tensor
-
-    for i in range(len(classes)):
-        if classes[i]==0:
-            xmin = str(int(boxes[i][0]))
-            ymin = str(int(boxes[i][1]))
-            xmax = str(int(boxes[i][2]))
-            ymax = str(int(boxes[i][3]))
-
-            file.writelines(xmin+','+ymin+','+xmax+','+ymax+',')
-            file.writelines('\r\n')
-    file.close()
+    classes = prediction['instances'].pred_classes.tolist()
+    boxes = prediction['instances'].pred_boxes.tensor.int().tolist()
+
+    # 한 번에 모아서 기록
+    lines = [
+        f"{xmin},{ymin},{xmax},{ymax},\r\n"
+        for cls, (xmin, ymin, xmax, ymax) in zip(classes, boxes)
+        if cls == 0
+    ]
+    with open(txt_save_path, 'w') as file:
+        file.write(''.join(lines))
+
+
+def expand_inputs(patterns):
+    # glob 패턴 / 폴더 / 파일 경로를 이미지 경로 리스트로 변환
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths.extend(sorted(glob.glob(pattern)))
+    return [path for path in paths if path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
+
+
+def prefetch_images(paths, loader, depth):
+    """스레드 풀에서 최대 depth 장까지 미리 디코딩하며 (경로, 이미지)를 순서대로 반환한다."""
+    pending = deque()
+    paths = iter(paths)
+    for path in paths:
+        pending.append((path, loader.submit(cv2.imread, path)))
+        if len(pending) >= depth:
+            break
+    while pending:
+        path, future = pending.popleft()
+        next_path = next(paths, None)
+        if next_path is not None:
+            pending.append((next_path, loader.submit(cv2.imread, next_path)))
+        yield path, future.result()
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_result(output_path, img_name, prediction, vis_output, polygons):
+    stem = os.path.splitext(img_name)[0]
+    txt_save_path = os.path.join(output_path, 'res_img' + stem + '.txt')
+    save_result_to_txt(txt_save_path,prediction,polygons)
+    if vis_output is not None:
+        vis_output.save(os.path.join(output_path, stem + '.jpg'))
 
 
 if __name__ == "__main__":
@@ -105,24 +163,48 @@ if __name__ == "__main__":
     cfg = setup_cfg(args)
     detection_demo = VisualizationDemo(cfg)
 
-    test_images_path = args.input
+    test_images = expand_inputs(args.input)
     output_path = args.output
+    os.makedirs(output_path, exist_ok=True)
+    batch_size = max(1, args.batch_size)
+    visualize = not args.no_vis
 
     start_time_all = time.time()
     img_count = 0
-    for i in glob.glob(test_images_path):
-        print(i)
-        img_name = os.path.basename(i)
-        img_save_path = output_path + img_name.split('.')[0] + '.jpg'
-        img = cv2.imread(i)
-        start_time = time.time()
-
-        prediction, vis_output, polygons = detection_demo.run_on_image(img)
-
-        txt_save_path = output_path + 'res_img' + img_name.split('.')[0] + '.txt'
-        save_result_to_txt(txt_save_path,prediction,polygons)
-
-        print("Time: {:.2f} s / img".format(time.time() - start_time))
-        vis_output.save(img_save_path)
-        img_count += 1
-    print("Average Time: {:.2f} s /img".format((time.time() - start_time_all) / img_count))
\ No newline at end of file
+    skipped = 0
+    inference_time = 0.0
+    write_futures = deque()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as loader, \
+            ThreadPoolExecutor(max_workers=max(1, args.workers)) as writer:
+        loaded = prefetch_images(test_images, loader, depth=max(1, args.workers) * batch_size * 2)
+        for batch in iter_batches(loaded, batch_size):
+            valid = [(path, img) for path, img in batch if img is not None]
+            skipped += len(batch) - len(valid)
+            if not valid:
+                continue
+
+            start_time = time.time()
+            results = detection_demo.run_on_batch([img for _, img in valid], visualize=visualize)
+            elapsed = time.time() - start_time
+            inference_time += elapsed
+            print("Batch of {}: {:.2f} s ({:.2f} s / img)".format(len(valid), elapsed, elapsed / len(valid)))
+
+            # 결과 기록(txt, 시각화 저장)은 별도 스레드에서 비동기로 수행
+            for (path, _), (prediction, vis_output, polygons) in zip(valid, results):
+                write_futures.append(writer.submit(
+                    write_result, output_path, os.path.basename(path), prediction, vis_output, polygons
+                ))
+            img_count += len(valid)
+
+            # 기록이 밀리면 대기 (메모리 사용량 제한)
+            while len(write_futures) > max(1, args.workers) * batch_size * 2:
+                write_futures.popleft().result()
+
+        for future in write_futures:
+            future.result()
+
+    total_time = time.time() - start_time_all
+    print("Processed {} images ({} unreadable) in {:.2f} s".format(img_count, skipped, total_time))
+    if img_count:
+        print("Average Time: {:.2f} s /img (inference {:.2f} s /img)".format(total_time / img_count, inference_time / img_count))
+        print("Throughput: {:.2f} img/s".format(img_count / total_time))
@@ -20,6 +20,7 @@ class Video(db.Model):
     video_code = db.Column(db.Integer, primary_key=True)  # Video 고유 코드 (PK)
     upload_time = db.Column(db.DateTime, nullable=False)  # 업로드 시간
     video_path = db.Column(db.String(255), nullable=False)  # 비디오 파일 경로
+    fps = db.Column(db.Float, nullable=True)  # 초당 프레임 수 (프레임 번호 -> 시각 변환용)
 
 # YOLO Result 테이블
 class YoloResult(db.Model):
@@ -40,6 +41,7 @@ class FirstPreprocessingResult(db.Model):
     video_code = db.Column(db.Integer, db.ForeignKey('video.video_code'), nullable=False)  # Video 코드 (FK)
     yolo_result_code = db.Column(db.Integer, db.ForeignKey('yolo_result.yolo_result_code'), nullable=False)  # YOLO 결과 코드 (FK)
     first_result_path = db.Column(db.String(255), nullable=False)  # 1차 전처리 결과 경로
+    frame_index = db.Column(db.Integer, nullable=True)  # 크롭이 나온 비디오 프레임 번호
     
     # 관계 설정
     video = db.relationship('Video', backref=db.backref('first_preprocessing_results', lazy=True))
@@ -53,6 +55,11 @@ class StdResult(db.Model):
     video_code = db.Column(db.Integer, db.ForeignKey('video.video_code'), nullable=False)  # Video 코드 (FK)
     first_result_code = db.Column(db.Integer, db.ForeignKey('1st_preprocessing_result.first_result_code'), nullable=False)  # 1차 전처리 결과 코드 (FK)
     std_result_path = db.Column(db.String(255), nullable=False)  # STD 결과 경로
+    box_x1 = db.Column(db.Integer, nullable=True)  # 텍스트 박스 좌표 (1차 전처리 이미지 = 패딩된 YOLO 크롭 기준, 크롭 여유 margin 제외)
+    box_y1 = db.Column(db.Integer, nullable=True)
+    box_x2 = db.Column(db.Integer, nullable=True)
+    box_y2 = db.Column(db.Integer, nullable=True)
+    score = db.Column(db.Float, nullable=True)  # STD 박스 점수
     
     # 관계 설정
     video = db.relationship('Video', backref=db.backref('std_results', lazy=True))
@@ -79,11 +86,43 @@ class StrResult(db.Model):
     video_code = db.Column(db.Integer, db.ForeignKey('video.video_code'), nullable=False)  # Video 코드 (FK)
     second_result_code = db.Column(db.Integer, db.ForeignKey('2nd_preprocessing.second_result_code'), nullable=False)  # 2차 전처리 결과 코드 (FK)
     str_result_path = db.Column(db.String(255), nullable=False)  # STR 결과 경로
+    text = db.Column(db.Text, nullable=True)  # 인식된 텍스트 (결과 파일을 열지 않고 조회/내보내기)
+    confidence = db.Column(db.Float, nullable=True, index=True)  # 글자별 신뢰도 평균
     
     # 관계 설정
     video = db.relationship('Video', backref=db.backref('str_results', lazy=True))
     second_result = db.relationship('SecondPreprocessingResult', backref=db.backref('str_results', lazy=True))
 
+# 파이프라인 작업 테이블
+class Job(db.Model):
+    __tablename__ = 'job'
+
+    job_id = db.Column(db.Integer, primary_key=True)  # 작업 ID (PK)
+    video_code = db.Column(db.Integer, db.ForeignKey('video.video_code'), nullable=False)  # Video 코드 (FK)
+    status = db.Column(db.String(32), nullable=False, default='running')  # running / failed / cancelled / completed
+    current_stage = db.Column(db.String(32), nullable=True)  # 마지막으로 실행한 단계
+    error_message = db.Column(db.Text, nullable=True)  # 실패 사유
+    created_time = db.Column(db.DateTime, nullable=False)  # 생성 시간
+    updated_time = db.Column(db.DateTime, nullable=False)  # 갱신 시간
+
+    # 관계 설정
+    video = db.relationship('Video', backref=db.backref('jobs', lazy=True))
+
+# 작업 단계 체크포인트 테이블 (단계/입력 코드별 완료 기록)
+class JobCheckpoint(db.Model):
+    __tablename__ = 'job_checkpoint'
+    __table_args__ = (db.UniqueConstraint('job_id', 'stage', 'input_code'),)
+
+    checkpoint_code = db.Column(db.Integer, primary_key=True)  # 체크포인트 코드 (PK)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.job_id'), nullable=False)  # 작업 ID (FK)
+    stage = db.Column(db.String(32), nullable=False)  # 단계 이름
+    input_code = db.Column(db.Integer, nullable=False, default=0)  # 입력 코드 (단계 전체 체크포인트는 0)
+    output_codes = db.Column(db.Text, nullable=False, default='')  # 출력 코드 목록 (쉼표 구분)
+    completed_time = db.Column(db.DateTime, nullable=False)  # 완료 시간
+
+    # 관계 설정
+    job = db.relationship('Job', backref=db.backref('checkpoints', lazy=True))
+
 class DetectionResult(db.Model):
     __tablename__ = 'detection_result'
     
@@ -0,0 +1,80 @@
+# persistence.py
+# 결과 행을 큐에 모아 전용 스레드에서 묶음으로 커밋하는 write-behind 저장소
+import os
+from concurrent.futures import Future
+from sqlalchemy import inspect
+from models import db
+from inference_scheduler import BatchScheduler
+
+WRITE_MAX_BATCH_SIZE = int(os.environ.get("REDSWUS_DB_WRITE_BATCH", "64"))
+
+
+def _log_failure(future):
+    # 결과를 기다리지 않는 (fire-and-forget) 쓰기의 실패도 기록
+    if future.exception() is not None:
+        print(f"결과 저장 실패: {future.exception()}")
+
+
+class WriteBehindWriter:
+    """
+    add(Model, **fields) 는 행을 큐에 넣고 바로 Future 를 반환한다 (결과는 생성된 PK).
+    전용 스레드가 여러 요청의 행을 모아 한 번의 트랜잭션으로 커밋하므로
+    동시 작업들이 DB 잠금을 두고 행마다 경쟁하지 않는다.
+    PK 가 필요한 호출자만 future.result() 로 기다리면 된다.
+    큐가 비어 있으면 기다리지 않고 바로 커밋하고, 커밋하는 동안 쌓인 행은 다음 트랜잭션에 함께 커밋한다.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.scheduler = BatchScheduler(self._commit_batch, max_batch_size=WRITE_MAX_BATCH_SIZE,
+                                        name="write-behind", flush_when_idle=True)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+    def add(self, model_cls, **fields):
+        if self.app is None:
+            # 앱에 연결되지 않은 경우 (CLI 등) 동기 저장
+            future = Future()
+            row = model_cls(**fields)
+            db.session.add(row)
+            db.session.commit()
+            future.set_result(inspect(row).identity[0])
+            return future
+
+        future = self.scheduler.submit((model_cls, fields))
+        future.add_done_callback(_log_failure)
+        return future
+
+    def _commit_batch(self, items):
+        with self.app.app_context():
+            rows = [model_cls(**fields) for model_cls, fields in items]
+            try:
+                db.session.add_all(rows)
+                db.session.flush()
+                codes = [inspect(row).identity[0] for row in rows]
+                db.session.commit()
+                return codes
+            except Exception:
+                db.session.rollback()
+
+            # 묶음 커밋 실패 시 한 행씩 다시 시도해서 문제 행만 실패 처리
+            results = []
+            for model_cls, fields in items:
+                row = model_cls(**fields)
+                try:
+                    db.session.add(row)
+                    db.session.commit()
+                    results.append(inspect(row).identity[0])
+                except Exception as e:
+                    db.session.rollback()
+                    results.append(e)
+            return results
+
+    def stats(self):
+        return self.scheduler.stats()
+
+# WriteBehindWriter 인스턴스 생성
+write_behind = WriteBehindWriter()
@@ -1,128 +1,96 @@
-#model_detection.py
-import argparse
-import glob
-import multiprocessing as mp
-import os
-import time
-import cv2
-import tqdm
-import numpy as np
-
-from detectron2.config import get_cfg
-from detectron2.data.detection_utils import read_image
-from detectron2.utils.logger import setup_logger
-
-from predictor import VisualizationDemo
-
-# constants
-WINDOW_NAME = "COCO detections"
-
-
-def setup_cfg(args):
-    # load config from file and command-line arguments
-    cfg = get_cfg()
-    cfg.merge_from_file(args.config_file)
-    cfg.merge_from_list(args.opts)
-    # Set model
-    cfg.MODEL.WEIGHTS = args.weights
-    # Set score_threshold for builtin models
-    cfg.MODEL.RETINANET.SCORE_THRESH_TEST = args.confidence_threshold
-    cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = args.confidence_threshold
-    cfg.MODEL.PANOPTIC_FPN.COMBINE.INSTANCES_CONFIDENCE_THRESH = args.confidence_threshold
-    # Set device to CPU only
-    cfg.MODEL.DEVICE = 'cpu'
-    cfg.freeze()
-    return cfg
-
-
-def get_parser():
-    parser = argparse.ArgumentParser(description="Detectron2 Demo")
-    parser.add_argument(
-        "--config-file",
-        default="./config.yaml",#사용할 yaml 파일 경로 및 파일명**
-        metavar="FILE",
-        help="path to config file",
-    )
-
-    parser.add_argument(
-        "--weights",
-        default="./model_0000599.pth", #ex) model_0000599.pth
-        metavar="pth",
-        help="the model used to inference",
-    )
-
-    parser.add_argument(
-        "--input",
-        default="./input/*.jpg",
-        nargs="+",
-        help="the folder of icdar2013 test images"
-    )
-
-    parser.add_argument(
-        "--output",
-        default="./output/",
-        help="A file or directory to save output visualizations. "
-        "If not given, will show output in an OpenCV window.",
-    )
-
-    parser.add_argument(
-        "--confidence-threshold",
-        type=float,
-        default=0.5,
-        help="Minimum score for instance predictions to be shown",
-    )
-    parser.add_argument(
-        "--opts",
-        help="Modify config options using the command-line 'KEY VALUE' pairs",
-        default=[],
-        nargs=argparse.REMAINDER,
-    )
-    return parser
-
-
-def save_result_to_txt(txt_save_path,prediction,polygons):
-
-    file = open(txt_save_path,'w')
-    classes = prediction['instances'].pred_classes
-    boxes = prediction['instances'].pred_boxes.tensor
-
-    for i in range(len(classes)):
-        if classes[i]==0:
-            xmin = str(int(boxes[i][0]))
-            ymin = str(int(boxes[i][1]))
-            xmax = str(int(boxes[i][2]))
-            ymax = str(int(boxes[i][3]))
-
-            file.writelines(xmin+','+ymin+','+xmax+','+ymax+',')
-            file.writelines('\r\n')
-    file.close()
-
-
-if __name__ == "__main__":
-
-    args = get_parser().parse_args()
-
-    cfg = setup_cfg(args)
-    detection_demo = VisualizationDemo(cfg)
-
-    test_images_path = args.input
-    output_path = args.output
-
-    start_time_all = time.time()
-    img_count = 0
-    for i in glob.glob(test_images_path):
-        print(i)
-        img_name = os.path.basename(i)
-        img_save_path = output_path + img_name.split('.')[0] + '.jpg'
-        img = cv2.imread(i)
-        start_time = time.time()
-
-        prediction, vis_output, polygons = detection_demo.run_on_image(img)
-
-        txt_save_path = output_path + 'res_img' + img_name.split('.')[0] + '.txt'
-        save_result_to_txt(txt_save_path,prediction,polygons)
-
-        print("Time: {:.2f} s / img".format(time.time() - start_time))
-        vis_output.save(img_save_path)
-        img_count += 1
-    print("Average Time: {:.2f} s /img".format((time.time() - start_time_all) / img_count))
\ No newline at end of file
+#predictor.py
+import torch
+
+from detectron2.data import MetadataCatalog
+from detectron2.engine import DefaultPredictor
+from detectron2.utils.visualizer import ColorMode, Visualizer
+
+
+class BatchPredictor(DefaultPredictor):
+    """
+    DefaultPredictor 와 같은 전처리를 하되, 여러 이미지를 한 번의 forward 로 추론한다.
+    """
+
+    def predict_batch(self, original_images, resize=True):
+        """
+        Args:
+            original_images (list[np.ndarray]): BGR 이미지 리스트 (H, W, C)
+            resize (bool): False 면 cfg 의 테스트 크기로 다시 조정하지 않고 입력 크기 그대로 추론
+
+        Returns:
+            list[dict]: 이미지별 모델 출력 (DefaultPredictor.__call__ 결과와 동일한 형식)
+        """
+        inputs = []
+        for original_image in original_images:
+            if self.input_format == "RGB":
+                original_image = original_image[:, :, ::-1]
+            height, width = original_image.shape[:2]
+            image = self.aug.get_transform(original_image).apply_image(original_image) if resize else original_image
+            image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1)).to(self.cfg.MODEL.DEVICE)
+            inputs.append({"image": image, "height": height, "width": width})
+        with torch.no_grad():
+            return self.model(inputs)
+
+
+def boxes_to_polygons(boxes):
+    # (x1, y1, x2, y2) 박스를 시계 방향 4점 폴리곤으로 변환
+    return [
+        [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        for x1, y1, x2, y2 in boxes.tolist()
+    ]
+
+
+class VisualizationDemo(object):
+    def __init__(self, cfg, instance_mode=ColorMode.IMAGE):
+        """
+        Args:
+            cfg (CfgNode):
+            instance_mode (ColorMode):
+        """
+        self.metadata = MetadataCatalog.get(
+            cfg.DATASETS.TEST[0] if len(cfg.DATASETS.TEST) else "__unused"
+        )
+        self.cpu_device = torch.device("cpu")
+        self.instance_mode = instance_mode
+        self.predictor = BatchPredictor(cfg)
+
+    def draw(self, image, predictions):
+        """
+        Args:
+            image (np.ndarray): BGR 이미지
+            predictions (dict): 모델 출력
+
+        Returns:
+            vis_output (VisImage): 시각화 결과
+        """
+        # Convert image from OpenCV BGR format to Matplotlib RGB format.
+        image = image[:, :, ::-1]
+        visualizer = Visualizer(image, self.metadata, instance_mode=self.instance_mode)
+        instances = predictions["instances"].to(self.cpu_device)
+        return visualizer.draw_instance_predictions(predictions=instances)
+
+    def _split(self, image, predictions, visualize):
+        instances = predictions["instances"].to(self.cpu_device)
+        polygons = boxes_to_polygons(instances.pred_boxes.tensor)
+        vis_output = self.draw(image, predictions) if visualize else None
+        return predictions, vis_output, polygons
+
+    def run_on_image(self, image, visualize=True):
+        """
+        Args:
+            image (np.ndarray): an image of shape (H, W, C) (in BGR order).
+                This is the format used by OpenCV.
+
+        Returns:
+            predictions (dict): the output of the model.
+            vis_output (VisImage): the visualized image output (None if visualize=False).
+            polygons (list): 4-point polygon of each predicted box.
+        """
+        return self.run_on_batch([image], visualize=visualize)[0]
+
+    def run_on_batch(self, images, visualize=True):
+        """
+        여러 이미지를 한 번에 추론한다. 반환값은 이미지별 run_on_image 결과 리스트.
+        """
+        outputs = self.predictor.predict_batch(images)
+        return [self._split(image, predictions, visualize) for image, predictions in zip(images, outputs)]
@@ -0,0 +1,97 @@
+# quality_router.py
+# 값싼 화질 지표로 전처리/인식 단계를 건너뛸지 결정하는 라우터
+import os
+import threading
+from collections import Counter
+import cv2
+import numpy as np
+
+# 라우팅 임계값 (환경변수로 조정)
+# 1차 전처리 생략: 충분히 선명하고 대비가 있으며 밝기가 적당한 이미지
+SHARP_LAPLACIAN_VAR = float(os.environ.get("REDSWUS_SHARP_LAPLACIAN_VAR", "300"))
+MIN_CONTRAST = float(os.environ.get("REDSWUS_MIN_CONTRAST", "50"))
+BRIGHTNESS_RANGE = (
+    float(os.environ.get("REDSWUS_MIN_BRIGHTNESS", "60")),
+    float(os.environ.get("REDSWUS_MAX_BRIGHTNESS", "200")),
+)
+# 2차 전처리(PSF 컨볼루션) 생략: 노이즈가 거의 없는(이미 매끄러운) 크롭
+PSF_NOISE_LAPLACIAN_VAR = float(os.environ.get("REDSWUS_PSF_NOISE_LAPLACIAN_VAR", "100"))
+# STR 전 크롭 제거: 너무 작거나 STD 점수가 낮은 크롭
+# (STD 는 SCORE_THRESH_TEST 0.5 이상 박스를 모두 남기므로, 그보다 높은 0.6 미만의 경계선 박스는
+#  2차 전처리/STR 을 거치지 않고 여기서 버린다. 0.5 이하로 내리면 점수 필터는 사실상 꺼짐)
+MIN_CROP_SIDE = int(os.environ.get("REDSWUS_MIN_CROP_SIDE", "8"))
+MIN_STD_SCORE = float(os.environ.get("REDSWUS_MIN_STD_SCORE", "0.6"))
+
+
+def quality_metrics(image):
+    """라플라시안 분산(선명도), 표준편차(대비), 평균 밝기, 크기를 계산한다."""
+    if image.ndim == 3:
+        gray = cv2.cvtColor(np.ascontiguousarray(image[..., :3]), cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+    if gray.dtype != np.uint8:
+        gray = np.clip(gray * 255 if gray.max() <= 1.0 else gray, 0, 255).astype(np.uint8)
+    mean, std = cv2.meanStdDev(gray)
+    return {
+        "sharpness": float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        "contrast": float(std[0][0]),
+        "brightness": float(mean[0][0]),
+        "height": int(gray.shape[0]),
+        "width": int(gray.shape[1]),
+    }
+
+
+class QualityRouter:
+    """라우팅 결정과 경로별 카운터를 관리한다 (스레드 안전)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def _count(self, route):
+        with self._lock:
+            self._counters[route] += 1
+
+    def needs_first_prepro(self, image):
+        # image 는 패딩 전 YOLO 크롭 (흰색 여백이 들어가면 대비/밝기가 부풀려짐)
+        metrics = quality_metrics(image)
+        low, high = BRIGHTNESS_RANGE
+        good = (metrics["sharpness"] >= SHARP_LAPLACIAN_VAR
+                and metrics["contrast"] >= MIN_CONTRAST
+                and low <= metrics["brightness"] <= high)
+        self._count("first_prepro.bypass" if good else "first_prepro.full")
+        return not good
+
+    def needs_psf(self, image):
+        metrics = quality_metrics(image)
+        noisy = metrics["sharpness"] >= PSF_NOISE_LAPLACIAN_VAR
+        self._count("second_prepro.psf" if noisy else "second_prepro.bypass")
+        return noisy
+
+    def keep_crop(self, crop, score):
+        if min(crop.shape[:2]) < MIN_CROP_SIDE:
+            self._count("crop.drop_small")
+            return False
+        if score < MIN_STD_SCORE:
+            self._count("crop.drop_score")
+            return False
+        self._count("crop.keep")
+        return True
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        # 생략된 연산 비율
+        first_total = counters.get("first_prepro.full", 0) + counters.get("first_prepro.bypass", 0)
+        psf_total = counters.get("second_prepro.psf", 0) + counters.get("second_prepro.bypass", 0)
+        crop_total = sum(v for k, v in counters.items() if k.startswith("crop."))
+        return {
+            "counters": counters,
+            "first_prepro_skipped_ratio": round(counters.get("first_prepro.bypass", 0) / first_total, 3) if first_total else 0.0,
+            "psf_skipped_ratio": round(counters.get("second_prepro.bypass", 0) / psf_total, 3) if psf_total else 0.0,
+            "str_skipped_ratio": round((crop_total - counters.get("crop.keep", 0)) / crop_total, 3) if crop_total else 0.0,
+        }
+
+
+# 전역 라우터 인스턴스
+quality_router = QualityRouter()
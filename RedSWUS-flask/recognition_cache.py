@@ -0,0 +1,125 @@
+# recognition_cache.py
+# 전처리된 텍스트 크롭의 지각 해시(dHash) + 크기 구간을 키로 하는 STR 결과 LRU 캐시
+import atexit
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+
+# dHash 격자: PARSeq 입력(128x32)과 같은 4:1 비율. 8x8 격자는 글자 하나가 1칸도 안 되어 다른 글자열이 충돌함
+HASH_WIDTH, HASH_HEIGHT = 32, 8
+
+
+def perceptual_hash(image: Image.Image, hash_width=HASH_WIDTH, hash_height=HASH_HEIGHT):
+    """
+    dHash: (hash_width+1) x hash_height 흑백 축소 이미지에서 가로 인접 픽셀의 밝기 증감을 비트로 만든다.
+    미세한 노이즈/압축 차이가 있는 거의 같은 크롭은 같은 해시가 된다.
+    """
+    small = np.asarray(image.convert('L').resize((hash_width + 1, hash_height), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def size_bucket(image: Image.Image):
+    # 크기가 크게 다른 크롭은 해시가 같아도 구분 (2의 거듭제곱 단위)
+    width, height = image.size
+    return round(math.log2(max(1, width))), round(math.log2(max(1, height)))
+
+
+class RecognitionCache:
+    """
+    용량 제한이 있는 LRU 캐시 (스레드 안전).
+    persist_path 가 주어지면 시작 시 불러오고, 종료 시와 save_every 번 추가마다 저장한다.
+    """
+
+    def __init__(self, capacity=4096, persist_path=None, save_every=256):
+        self.capacity = max(0, int(capacity))
+        self.persist_path = persist_path
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        # 지표
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    @property
+    def enabled(self):
+        return self.capacity > 0
+
+    @staticmethod
+    def key(image: Image.Image):
+        width_bucket, height_bucket = size_bucket(image)
+        return f"{perceptual_hash(image):0{HASH_WIDTH * HASH_HEIGHT // 4}x}:{width_bucket}x{height_bucket}"
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._unsaved += 1
+            should_save = self.persist_path and self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"인식 캐시 로드 실패: {e}")
+            return
+        with self._lock:
+            # 저장된 순서 = 오래된 것부터
+            for key, value in entries[-self.capacity:] if self.capacity else []:
+                self._entries[key] = value
+
+    def save(self):
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+            self._unsaved = 0
+        # 임시 파일에 쓰고 교체 (쓰는 도중 종료되어도 기존 파일 유지)
+        temp_path = f"{self.persist_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.persist_path)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "persist_path": self.persist_path,
+        }
@@ -0,0 +1,91 @@
+# runtime_config.py
+# torch / OpenCV / 요청 동시성의 CPU 스레드 예산을 한곳에서 관리한다.
+import os
+import threading
+import cv2
+import torch
+
+# 환경변수로 조정 가능한 기본값
+CPU_COUNT = os.cpu_count() or 1
+REQUEST_CONCURRENCY = int(os.environ.get("REDSWUS_REQUEST_CONCURRENCY", "1"))
+# 모델 단계는 요청 수와 관계없이 모델마다 하나인 배치 스케줄러 워커 스레드에서만 실행된다
+MODEL_STAGES = ("yolo", "std", "str")
+
+# 모델별 마이크로 배치 설정 (inference_scheduler.BatchScheduler)
+YOLO_MAX_BATCH_SIZE = int(os.environ.get("REDSWUS_YOLO_MAX_BATCH", "8"))
+STD_MAX_BATCH_SIZE = int(os.environ.get("REDSWUS_STD_MAX_BATCH", "4"))
+STR_MAX_BATCH_SIZE = int(os.environ.get("REDSWUS_STR_MAX_BATCH", "32"))
+BATCH_MAX_WAIT = float(os.environ.get("REDSWUS_BATCH_MAX_WAIT_MS", "10")) / 1000.0
+
+# STR 인식 캐시 (recognition_cache.RecognitionCache), 용량 0 이면 비활성화
+STR_CACHE_SIZE = int(os.environ.get("REDSWUS_STR_CACHE_SIZE", "4096"))
+STR_CACHE_PATH = os.environ.get("REDSWUS_STR_CACHE_PATH") or None
+
+_lock = threading.Lock()
+_settings = None
+
+
+def compute_budgets(concurrency, cpu_count=CPU_COUNT, processes=1):
+    """
+    torch 와 전처리(cv2) 스레드 예산을 계산한다.
+    - torch intra-op 스레드 수는 프로세스 전역 설정이라 모델별로 다르게 줄 수 없다.
+      모델 워커 스레드(YOLO/STD/STR) 셋이 동시에 추론할 수 있으므로 워커 하나당 예산으로 계산한다.
+    - 전처리는 요청 스레드에서 실행되므로 남은 코어를 동시 요청 수로 나눈다.
+    모델 워커 수 x torch + 동시 요청 수 x prepro 가 cpu_count 를 넘지 않는다 (예산이 최소값 1 로 올림되는 경우 제외).
+    processes 는 같은 코어를 나눠 쓰는 프로세스 수 (구간 분할 처리 워커).
+    """
+    concurrency = max(1, int(concurrency))
+    cpu_count = max(1, cpu_count // max(1, int(processes)))
+    workers = len(MODEL_STAGES)
+    # 환경변수로 예산 개별 지정 (예: REDSWUS_THREADS_TORCH=2, REDSWUS_THREADS_PREPRO=1)
+    torch_override = os.environ.get("REDSWUS_THREADS_TORCH")
+    torch_threads = max(1, int(torch_override) if torch_override else cpu_count // (workers + concurrency))
+    prepro_override = os.environ.get("REDSWUS_THREADS_PREPRO")
+    prepro_threads = max(1, int(prepro_override) if prepro_override
+                         else (cpu_count - workers * torch_threads) // concurrency)
+    return {
+        "torch": torch_threads,
+        "prepro": prepro_threads,
+        # 모든 모델 워커와 요청이 동시에 돌 때의 최대 스레드 수
+        "total": workers * torch_threads + concurrency * prepro_threads,
+    }
+
+
+def configure_runtime(concurrency=None, processes=1):
+    """
+    torch intra/inter-op 스레드와 cv2 스레드 풀을 예산에 맞게 설정한다.
+    모델 로드 전에 (핸들러 import 전에) 한 번 호출해야 한다.
+    """
+    global _settings
+    with _lock:
+        concurrency = REQUEST_CONCURRENCY if concurrency is None else max(1, int(concurrency))
+        budgets = compute_budgets(concurrency, processes=processes)
+
+        torch.set_num_threads(budgets["torch"])
+        interop_threads = max(1, min(2, budgets["torch"]))
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # 이미 병렬 작업이 시작된 뒤에는 변경 불가
+            interop_threads = torch.get_num_interop_threads()
+
+        cv2.setNumThreads(budgets["prepro"])
+
+        _settings = {
+            "cpu_count": CPU_COUNT,
+            "request_concurrency": concurrency,
+            "processes": max(1, int(processes)),
+            "model_workers": len(MODEL_STAGES),
+            "thread_budgets": budgets,
+            "torch_num_threads": torch.get_num_threads(),
+            "torch_num_interop_threads": interop_threads,
+            "cv2_num_threads": cv2.getNumThreads(),
+        }
+        return dict(_settings)
+
+
+def get_runtime_settings():
+    """현재 적용된 스레드 설정 (진단용)."""
+    if _settings is None:
+        return configure_runtime()
+    return dict(_settings)
@@ -1,5 +1,5 @@
 import os
-from flask import request, jsonify
+from flask import jsonify
 from skimage.io import imread
 from skimage.color import rgb2gray
 from scipy.ndimage import convolve
@@ -7,7 +7,9 @@ import numpy as np
 from scipy.ndimage import gaussian_filter
 import imageio.v2 as imageio
 import matplotlib.pyplot as plt
-from models import db, SecondPreprocessingResult, StdResult
+from models import SecondPreprocessingResult, StdResult
+from quality_router import quality_router
+from persistence import write_behind
 
 # Second Preprocessing 핸들러 클래스
 class SecondPreproAPP:
@@ -21,7 +23,26 @@ class SecondPreproAPP:
         self.psf[2, 2] = 1           # 중심에 값을 1로 설정
         self.psf = gaussian_filter(self.psf, sigma=1)  # 가우시안 필터 적용
 
-    def process_images(self, std_result_code):
+    def apply(self, image):
+        """
+        RGB(또는 흑백) 이미지에 2차 전처리를 적용해 0-255 흑백 이미지를 반환한다 (DB 기록 없음).
+        """
+        apply_psf = quality_router.needs_psf(image)
+
+        # 이미지를 흑백으로 변환 (RGBA -> RGB -> 그레이스케일)
+        if image.ndim == 3 and image.shape[2] == 4:  # RGBA인 경우
+            image = image[..., :3]  # RGB로 변환
+        if image.ndim == 3:
+            image = rgb2gray(image)
+
+        # 컨볼루션 적용 (노이즈가 거의 없는 크롭은 생략)
+        convolved = convolve(image, self.psf) if apply_psf else image
+        return (convolved * 255).astype(np.uint8)  # 0-255 범위로 변환
+
+    def process_images(self, std_result_code, image=None):
+        """
+        image가 주어지면 (STD 단계에서 넘겨준 BGR ROI 뷰) 파일을 다시 읽지 않고 바로 사용한다.
+        """
 
         # std_result_code가 없으면 에러 반환
         if not std_result_code:
@@ -33,35 +54,29 @@ class SecondPreproAPP:
             return jsonify({"status": "error", "message": f"StdResult with ID {std_result_code} not found."}), 404
 
         input_image_path = std_result.std_result_path
-        if not os.path.exists(input_image_path):
+        if image is None and not os.path.exists(input_image_path):
             return jsonify({"status": "error", "message": f"File not found at {input_image_path}."}), 404
         
         try:
             # 이미지 로드 및 처리
-            image = imread(input_image_path)
-            
-            # 이미지를 흑백으로 변환 (RGBA -> RGB -> 그레이스케일)
-            if image.ndim == 3 and image.shape[2] == 4:  # RGBA인 경우
-                image = image[..., :3]  # RGB로 변환
-            if image.ndim == 3:
-                image = rgb2gray(image)
-
-            # 컨볼루션 적용
-            convolved = convolve(image, self.psf)
+            if image is None:
+                image = imread(input_image_path)
+            elif image.ndim == 3:
+                image = image[..., 2::-1]  # BGR -> RGB (복사 없는 뷰)
+            output_image = self.apply(image)
 
             # 처리된 이미지 저장 (파일 형식 유지)
             output_filename = f"second_prepro_{std_result_code}.png"
             output_image_path = os.path.join(self.output_folder, output_filename)
-            imageio.imwrite(output_image_path, (convolved * 255).astype(np.uint8))  # 0-255 범위로 변환하여 저장
+            imageio.imwrite(output_image_path, output_image)
 
             # 처리된 이미지 데이터베이스에 저장
-            second_prepro_result = SecondPreprocessingResult(
+            second_result_code = write_behind.add(
+                SecondPreprocessingResult,
                 video_code=std_result.video_code,
                 std_result_code=std_result_code,
                 second_result_path=output_image_path
-            )
-            db.session.add(second_prepro_result)
-            db.session.commit()
+            ).result()
 
             # 처리된 이미지 표시 (옵션)
             # plt.imshow(convolved, cmap='gray')
@@ -72,7 +87,8 @@ class SecondPreproAPP:
                 "status": "success",
                 "message": "Second preprocessing completed successfully.",
                 "second_result_path": output_image_path,
-                "second_code_number": second_prepro_result.second_result_code
+                "second_code_number": second_result_code,
+                "second_image": output_image  # STR 단계로 메모리에서 바로 전달
             }, 200
 
         except Exception as e:
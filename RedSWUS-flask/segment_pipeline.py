@@ -0,0 +1,126 @@
+# segment_pipeline.py
+# 긴 비디오를 시간 구간으로 나눠 여러 프로세스에서 동시에 전체 단계를 실행하고 결과를 시간순으로 합친다
+import math
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from frame_source import probe_video
+from cancellation import JOB_TIMEOUT
+
+# 구간 길이(초)와 워커 프로세스 수
+SEGMENT_SECONDS = float(os.environ.get("REDSWUS_SEGMENT_SECONDS", "300"))
+SEGMENT_WORKERS = int(os.environ.get("REDSWUS_SEGMENT_WORKERS", "2"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_app = None
+
+
+def split_segments(duration, segment_seconds):
+    """[0, duration) 을 segment_seconds 단위 (start, end) 구간으로 나눈다. 마지막 구간의 end 는 None (끝까지)."""
+    count = max(1, math.ceil(duration / segment_seconds)) if duration > 0 else 1
+    return [
+        (index * segment_seconds, (index + 1) * segment_seconds if index < count - 1 else None)
+        for index in range(count)
+    ]
+
+
+def _init_worker(workers):
+    """
+    워커 프로세스 초기화: 코어를 워커 수로 나눠 스레드 예산을 잡은 뒤 DB 와 모델을 준비한다.
+    모델은 프로세스마다 한 번만 로드되고 이후 구간 처리에 재사용된다.
+    """
+    global _worker_app
+    from runtime_config import configure_runtime
+    configure_runtime(concurrency=1, processes=workers)
+
+    from flask import Flask
+    from models import db
+    from db_config import configure_database
+    from persistence import write_behind
+    import streaming_pipeline  # noqa: F401 (모델 로드)
+
+    app = Flask(__name__)
+    configure_database(app)
+    db.init_app(app)
+    write_behind.init_app(app)
+    _worker_app = app
+
+
+def _process_segment(video_id, video_path, segment_index, start_time, end_time, deadline=None):
+    from streaming_pipeline import StreamingPipeline
+    from yolo_handlers import yolo_app
+    from cancellation import CancelToken
+
+    # 구간마다 별도 YOLO 폴더를 쓰되, 모든 결과는 같은 Video 에 연결
+    output_path = os.path.join(yolo_app.project_path(video_id), f"segment_{segment_index:03d}")
+    # deadline 은 프로세스 간에 공유되는 벽시계 시각
+    job_timeout = max(0.001, deadline - time.time()) if deadline else None
+    pipeline = StreamingPipeline(_worker_app, video_id, video_path,
+                                 start_time=start_time, end_time=end_time, output_path=output_path,
+                                 cancel_token=CancelToken(job_timeout=job_timeout, stage_timeouts={}))
+    results = []
+    for result in pipeline:
+        result["segment"] = segment_index
+        results.append(result)
+    return results
+
+
+def get_pool(workers=SEGMENT_WORKERS):
+    # 모델 로드 비용 때문에 워커 프로세스 풀은 요청 간에 재사용
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(workers,))
+        return _pool
+
+
+def run_segmented(video_id, video_path, segment_seconds=SEGMENT_SECONDS, timeout=JOB_TIMEOUT):
+    deadline = time.time() + timeout if timeout else None
+    duration, _ = probe_video(video_path)
+    segments = split_segments(duration, segment_seconds)
+    print(f"비디오 {video_id}: {duration:.1f}초, {len(segments)}개 구간으로 분할")
+
+    pool = get_pool()
+    futures = [
+        pool.submit(_process_segment, video_id, video_path, index, start_time, end_time, deadline)
+        for index, (start_time, end_time) in enumerate(segments)
+    ]
+
+    results = []
+    try:
+        for future in futures:
+            # 워커도 같은 마감 시각에 스스로 멈추므로 약간의 여유를 둠
+            remaining = max(0.0, deadline - time.time()) + 5 if deadline else None
+            results.extend(future.result(timeout=remaining))
+    except FutureTimeout:
+        for future in futures:
+            future.cancel()
+        return {
+            "status": "error",
+            "message": "Segmented pipeline deadline exceeded."
+        }, 504
+    except Exception as e:
+        for future in futures:
+            future.cancel()
+        return {
+            "status": "error",
+            "message": f"An error occurred during segmented pipeline execution: {str(e)}"
+        }, 500
+
+    # 구간 처리 순서와 관계없이 시간순으로 정렬
+    results.sort(key=lambda result: (
+        result["timestamp"] if result["timestamp"] is not None else float("inf"),
+        result["str_result_code"]
+    ))
+    return {
+        "status": "success",
+        "message": "Segmented pipeline completed successfully.",
+        "video_id": video_id,
+        "segments": [{"start": start_time, "end": end_time} for start_time, end_time in segments],
+        "str_result": [result["text"] for result in results],
+        "results": results
+    }, 200
@@ -0,0 +1,128 @@
+# size_policy.py
+# STD 입력 해상도를 결정하는 정책: 큰 입력은 줄이고, 박스는 원본 좌표로 되돌린다
+import os
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+class SizePolicy:
+    """
+    - max_side: 긴 변의 최대 길이 (이보다 크면 축소)
+    - test_scales: 짧은 변 후보 길이들. 같은 비디오(key)에서 탐지된 글자 높이를 기준으로
+      text_height_target 을 만족하는 가장 작은 후보를 고른다 (key 나 추정치가 없으면 가장 큰 후보).
+
+    글자 높이 추정치는 key 마다 따로 두어 다른 비디오의 영향을 받지 않고,
+    가장 큰 후보로 처리한 이미지(probe_every 장마다 한 번씩 강제)의 박스로만 갱신한다.
+    축소된 입력에서는 작은 글자를 놓치므로 그 결과로 추정치를 갱신하면 계속 축소만 고르게 된다.
+    """
+
+    def __init__(self, max_side, test_scales, text_height_target=16, momentum=0.8, probe_every=10, max_keys=256):
+        self.max_side = int(max_side)
+        self.test_scales = sorted(int(scale) for scale in test_scales)
+        self.text_height_target = float(text_height_target)
+        self.momentum = momentum
+        self.probe_every = max(1, int(probe_every))
+        self.max_keys = max(1, int(max_keys))
+        # key -> {"text_height": 원본 좌표계 글자 높이 추정치 (px), "images": 처리한 이미지 수}
+        self._estimates = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cfg(cls, cfg):
+        # 기본값은 config.yaml 의 테스트 크기와 동일 (동작 변화 없음), 환경변수로 조정
+        if cfg is not None:
+            max_size_test, min_size_test = cfg.INPUT.MAX_SIZE_TEST, cfg.INPUT.MIN_SIZE_TEST
+        else:
+            # 가짜 백엔드 (cfg 없음): config.yaml 과 같은 값
+            max_size_test, min_size_test = 1500, 800
+        max_side = int(os.environ.get("REDSWUS_STD_MAX_SIDE", max_size_test))
+        scales = os.environ.get("REDSWUS_STD_TEST_SCALES", str(min_size_test))
+        text_height_target = float(os.environ.get("REDSWUS_STD_TEXT_HEIGHT", "16"))
+        probe_every = int(os.environ.get("REDSWUS_STD_SCALE_PROBE_EVERY", "10"))
+        return cls(max_side, [scale for scale in scales.split(',') if scale], text_height_target,
+                   probe_every=probe_every)
+
+    def _scale_for(self, image, target_short):
+        height, width = image.shape[:2]
+        short_side, long_side = min(height, width), max(height, width)
+        scale = target_short / short_side
+        if long_side * scale > self.max_side:
+            scale = self.max_side / long_side
+        return scale
+
+    def full_scale(self, image):
+        # 가장 큰 후보 크기의 배율 (재현율 기준)
+        return self._scale_for(image, self.test_scales[-1])
+
+    def _state(self, key):
+        # 호출 전에 self._lock 을 잡아야 함. 오래 쓰이지 않은 key 부터 정리
+        state = self._estimates.get(key)
+        if state is None:
+            state = self._estimates[key] = {"text_height": None, "images": 0}
+            while len(self._estimates) > self.max_keys:
+                self._estimates.popitem(last=False)
+        else:
+            self._estimates.move_to_end(key)
+        return state
+
+    def choose_scale(self, image, key=None):
+        target_short = self.test_scales[-1]
+        if key is None or len(self.test_scales) == 1:
+            return self._scale_for(image, target_short)
+
+        with self._lock:
+            state = self._state(key)
+            probe = state["images"] % self.probe_every == 0
+            state["images"] += 1
+            text_height = state["text_height"]
+
+        if text_height is not None and not probe:
+            short_side = min(image.shape[:2])
+            for scale in self.test_scales:
+                if text_height * scale / short_side >= self.text_height_target:
+                    target_short = scale
+                    break
+        return self._scale_for(image, target_short)
+
+    @staticmethod
+    def resize(image, scale):
+        if abs(scale - 1.0) < 1e-3:
+            return image
+        height, width = image.shape[:2]
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=interpolation)
+
+    @staticmethod
+    def rescale_boxes(boxes, scale):
+        # 축소된 좌표계의 박스를 원본 좌표계로 변환
+        return boxes / scale
+
+    def observe(self, boxes, key=None, full_scale=True):
+        """
+        원본 좌표계 박스로 key 의 글자 높이 추정치를 갱신한다.
+        가장 큰 후보보다 작게 처리한 결과(full_scale=False)는 작은 글자가 빠져 있으므로 사용하지 않는다.
+        """
+        if key is None or not full_scale or len(boxes) == 0:
+            return
+        median_height = float(np.median(boxes[:, 3] - boxes[:, 1]))
+        with self._lock:
+            state = self._state(key)
+            if state["text_height"] is None:
+                state["text_height"] = median_height
+            else:
+                state["text_height"] = self.momentum * state["text_height"] + (1 - self.momentum) * median_height
+
+    def stats(self):
+        with self._lock:
+            estimates = [state["text_height"] for state in self._estimates.values() if state["text_height"] is not None]
+        return {
+            "max_side": self.max_side,
+            "test_scales": self.test_scales,
+            "text_height_target": self.text_height_target,
+            "probe_every": self.probe_every,
+            "tracked_keys": len(self._estimates),
+            "median_text_height_estimate": round(float(np.median(estimates)), 2) if estimates else None,
+        }
@@ -1,28 +1,88 @@
 import os
+from functools import partial
 import cv2
 import numpy as np
-import tempfile
 import torch
-from detectron2.engine import DefaultPredictor
-from detectron2.config import get_cfg
-from models import StdResult, db, FirstPreprocessingResult
+from models import StdResult, FirstPreprocessingResult
+from inference_scheduler import BatchScheduler
+from runtime_config import STD_MAX_BATCH_SIZE, BATCH_MAX_WAIT
+from quality_router import quality_router
+from size_policy import SizePolicy
+from persistence import write_behind
+from cancellation import JobCancelled
+from stub_backends import stubs_enabled, stub_batch_fn
 
 
 
 class DetectronHandler:
-    def __init__(self):
-        # Detectron2 설정 및 모델 초기화
-        torch.cuda.empty_cache() 
-        self.cfg = get_cfg()
-        self.cfg.merge_from_file("./config.yaml")
-        self.cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.5
-        self.cfg.MODEL.WEIGHTS = "./pt/model_0000599.pth"
-        self.cfg.MODEL.DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-        self.predictor = DefaultPredictor(self.cfg)
-
-    def handle_std_predict(self, first_result_code):
+    def __init__(self, output_folder="./stdoutput"):
+        self.output_folder = output_folder
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        if stubs_enabled():
+            # 부하 테스트용 가짜 백엔드: detectron2 와 가중치를 로드하지 않음
+            self.cfg = None
+            self.predictor = None
+            self.size_policy = SizePolicy.from_cfg(None)
+            batch_fn = stub_batch_fn("std")
+        else:
+            # Detectron2 설정 및 모델 초기화
+            from detectron2.config import get_cfg
+            from predictor import BatchPredictor
+
+            torch.cuda.empty_cache()
+            self.cfg = get_cfg()
+            self.cfg.merge_from_file("./config.yaml")
+            self.cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.5
+            self.cfg.MODEL.WEIGHTS = "./pt/model_0000599.pth"
+            self.cfg.MODEL.DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+            self.predictor = BatchPredictor(self.cfg)
+            # 입력 해상도는 SizePolicy 가 정하므로 모델 쪽에서는 다시 리사이즈하지 않음
+            self.size_policy = SizePolicy.from_cfg(self.cfg)
+            batch_fn = partial(self.predictor.predict_batch, resize=False)
+        # 동시 요청의 이미지를 모아 한 번에 추론
+        self.scheduler = BatchScheduler(batch_fn, max_batch_size=STD_MAX_BATCH_SIZE,
+                                        max_wait=BATCH_MAX_WAIT, name="std-scheduler")
+
+    @staticmethod
+    def crop_boxes(img, boxes, classes, margin=10):
+        """
+        박스마다 (클래스, 좌표, ROI 뷰)를 반환하는 제너레이터.
+        ROI는 원본 이미지의 슬라이스 뷰(복사 없음)이므로, 원본보다 오래 보관하려면 호출자가 복사해야 한다.
+        """
+        height, width = img.shape[:2]
+        for box, cls in zip(boxes, classes):
+            x1, y1, x2, y2 = box
+
+            # 여유 공간 추가 (margin 픽셀씩)
+            x1 = max(0, int(x1) - margin)
+            y1 = max(0, int(y1) - margin)
+            x2 = min(width, int(x2) + margin)
+            y2 = min(height, int(y2) + margin)
+
+            yield int(cls), (x1, y1, x2, y2), img[y1:y2, x1:x2]
+
+    def detect(self, img, cancel_token=None, key=None):
+        """
+        DB 기록 없이 STD 만 수행한다. 원본 좌표계의 (boxes, classes, scores) 를 반환.
+        key (비디오 코드) 가 있으면 같은 비디오의 글자 높이 추정치로 입력 해상도를 고른다.
+        """
+        scale = self.size_policy.choose_scale(img, key)
+        future = self.scheduler.submit(self.size_policy.resize(img, scale))
+        # 기다리는 중 취소되면 아직 배치에 들어가지 않은 요청은 추론하지 않음
+        outputs = cancel_token.wait(future) if cancel_token is not None else future.result()
+        print(f"Prediction completed. (scale {scale:.2f})")
+        instances = outputs["instances"].to("cpu")
+        # 축소된 입력 기준 박스를 원본 좌표로 되돌림
+        boxes = self.size_policy.rescale_boxes(instances.pred_boxes.tensor.numpy(), scale)
+        self.size_policy.observe(boxes, key, full_scale=scale >= self.size_policy.full_scale(img) - 1e-6)
+        return boxes, instances.pred_classes.numpy(), instances.scores.numpy()
+
+    def handle_std_predict(self, first_result_code, image=None, cancel_token=None, return_crops=False):
         """
         STD 예측을 처리하는 메서드.
+        image 가 주어지면 (스트리밍 파이프라인) 1차 전처리 결과 파일을 다시 읽지 않는다.
+        return_crops 면 응답의 "crops" 에 std_result_code -> 크롭 이미지(복사본)를 담아 다음 단계로 넘긴다.
         """
         torch.cuda.empty_cache() 
         first_result = FirstPreprocessingResult.query.filter_by(first_result_code=first_result_code).first()
@@ -31,69 +91,77 @@ class DetectronHandler:
             return {"error": "First preprocessing result not found."}, 404
         file_path = first_result.first_result_path
         print(f"Processing file path: {first_result.first_result_path}")
-        if not os.path.exists(file_path):
+        if image is None and not os.path.exists(file_path):
             print("Failed to load the image.")
             return {"error": "File not found at the specified path."}, 404
         try: 
-            with open(file_path, 'rb') as file:
-                np_img = np.frombuffer(file.read(), np.uint8)  # 파일 데이터를 NumPy 배열로 변환
-
-            # NumPy 배열을 OpenCV 이미지로 디코딩
-            img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+            if image is not None:
+                # 흑백 전처리 결과는 파일에서 읽을 때(IMREAD_COLOR)와 같이 3채널로 맞춤
+                img = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+            else:
+                with open(file_path, 'rb') as file:
+                    np_img = np.frombuffer(file.read(), np.uint8)  # 파일 데이터를 NumPy 배열로 변환
+
+                # NumPy 배열을 OpenCV 이미지로 디코딩
+                img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
             if img is None:
                 return {"error": "Failed to load the image for prediction."}, 400
 
             # Detectron2 예측 실행
-            
-            outputs = self.predictor(img)
-            print("Prediction completed.")
-            instances = outputs["instances"].to("cpu")
-            boxes = instances.pred_boxes.tensor.numpy()
-            classes = instances.pred_classes.numpy()
-            scores = instances.scores.numpy()
+            boxes, classes, scores = self.detect(img, cancel_token=cancel_token, key=first_result.video_code)
             # 바운딩 박스대로 이미지 크롭
 
             if boxes.size == 0:
                 return 0
 
-            for box, cls, score in zip(boxes, classes, scores):
-                x1, y1, x2, y2 = box
-
-                # 여유 공간 추가 (10픽셀씩)
-                x1 = max(0, int(x1) - 10)
-                y1 = max(0, int(y1) - 10)
-                x2 = min(img.shape[1], int(x2) + 10)
-                y2 = min(img.shape[0], int(y2) + 10)
-
-                cropped_img = img[y1:y2, x1:x2]
-
-                # 임시 파일로 저장
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'_cropped_{cls}.jpg')
-                temp_filename = temp_file.name
-
-                # 경로 문자열 교체: /tmp -> ./stdoutput
-                temp_filename = temp_filename.replace('/tmp/', './stdoutput/')
-                cv2.imwrite(temp_filename, cropped_img)
-
-            std_result =  StdResult(
-                video_code=first_result.video_code,
-                first_result_code=first_result.first_result_code,
-                std_result_path=temp_filename
-            )
-
-            db.session.add(std_result)
-            db.session.commit()
-
-            print(first_result_code, temp_filename)
-
-            return {
-                "std_result_code": std_result.std_result_code,
+            pending_codes = []
+            cropped_paths = []
+            cropped_imgs = [] if return_crops else None
+            for index, ((cls, _, cropped_img), score) in enumerate(zip(self.crop_boxes(img, boxes, classes), scores)):
+                # 너무 작거나 점수가 낮은 크롭은 STR 까지 보내지 않음
+                if not quality_router.keep_crop(cropped_img, score):
+                    continue
+
+                # 박스마다 결과 파일을 하나씩 저장 (임시 파일 사용 안 함)
+                output_filename = f"std_{first_result_code}_{index}_cropped_{cls}.jpg"
+                output_path = os.path.join(self.output_folder, output_filename)
+                cv2.imwrite(output_path, cropped_img)
+
+                # 박스는 크롭 여유(margin) 없이 STD 가 찾은 그대로 저장 (패딩된 YOLO 크롭 좌표)
+                x1, y1, x2, y2 = (int(round(float(value))) for value in boxes[index])
+
+                # write-behind 저장 (박스 전체를 큐에 넣은 뒤 코드를 한꺼번에 받음)
+                pending_codes.append(write_behind.add(
+                    StdResult,
+                    video_code=first_result.video_code,
+                    first_result_code=first_result.first_result_code,
+                    std_result_path=output_path,
+                    box_x1=x1, box_y1=y1, box_x2=x2, box_y2=y2,
+                    score=float(score)
+                ))
+                cropped_paths.append(output_path)
+                if return_crops:
+                    # 작은 ROI 만 복사해 두어 패딩된 원본 이미지 전체가 메모리에 남지 않게 함
+                    cropped_imgs.append(cropped_img.copy())
+
+            std_result_codes = [future.result() for future in pending_codes]
+
+            print(first_result_code, cropped_paths)
+
+            response = {
+                "std_result_codes": std_result_codes,
                 "boxes": boxes.tolist(),
                 "classes": classes.tolist(),
                 "scores": scores.tolist(),
-                "cropped_images": temp_filename  # 크롭된 이미지 경로 리스트 추가
-            }, 200
-
+                "cropped_images": cropped_paths  # 크롭된 이미지 경로 리스트
+            }
+            if return_crops:
+                # 후속 단계(2차 전처리)로 크롭 이미지를 바로 전달
+                response["crops"] = dict(zip(std_result_codes, cropped_imgs))
+            return response, 200
+
+        except JobCancelled:
+            raise
         except Exception as e:
             return {"error": f"Prediction failed: {str(e)}"}, 500
 
@@ -119,9 +187,9 @@ def run_all_handlers(first_result_list):
             return std_response
 
         # STD Predict 결과 처리
-        std_result_code = std_response[0].get("std_result_code")
-        print(std_result_code)
-        std_result_list.append(std_result_code)
+        std_result_codes = std_response[0].get("std_result_codes")
+        print(std_result_codes)
+        std_result_list.extend(std_result_codes)
 
     print(std_result_list)
     return {
@@ -129,4 +197,4 @@ def run_all_handlers(first_result_list):
         "std_result_list": std_result_list
     }, 200
 
-__all__ = ["run_all_handlers"]
+__all__ = ["run_all_handlers", "detectron_handler"]
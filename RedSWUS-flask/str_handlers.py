@@ -1,10 +1,15 @@
 # str_handlers.py
-from flask import request, jsonify
-from models import db, SecondPreprocessingResult, StrResult
+from flask import jsonify
+from models import SecondPreprocessingResult, StrResult
 from PIL import Image
 import os
 import torch
 from torchvision import transforms as T
+from inference_scheduler import BatchScheduler
+from recognition_cache import RecognitionCache
+from stub_backends import stubs_enabled, stub_batch_fn
+from persistence import write_behind
+from runtime_config import STR_MAX_BATCH_SIZE, BATCH_MAX_WAIT, STR_CACHE_SIZE, STR_CACHE_PATH
 
 # STR 모델 관련 클래스
 class STRApp:
@@ -15,6 +20,12 @@ class STRApp:
             T.ToTensor(),
             T.Normalize(0.5, 0.5)
         ])
+        # 동시 요청의 크롭을 모아 한 번에 추론
+        batch_fn = stub_batch_fn("str") if stubs_enabled() else self.STRpredict_batch
+        self.scheduler = BatchScheduler(batch_fn, max_batch_size=STR_MAX_BATCH_SIZE,
+                                        max_wait=BATCH_MAX_WAIT, name="str-scheduler")
+        # 거의 같은 크롭은 PARSeq 를 다시 돌리지 않도록 결과를 캐시
+        self.cache = RecognitionCache(capacity=STR_CACHE_SIZE, persist_path=STR_CACHE_PATH)
 
     def _load_model(self):
         if self._model is None:
@@ -25,29 +36,86 @@ class STRApp:
         return SecondPreprocessingResult.query.filter_by(second_result_code=second_result_code).first()
 
 
-    def save_str_result(self, video_code, second_result_code, str_result_path):
-        str_result = StrResult(
+    def save_str_result(self, video_code, second_result_code, str_result_path, text_result=None):
+        # write-behind 저장, 생성될 str_result_code 의 Future 반환
+        # 텍스트와 신뢰도도 함께 저장해 내보내기 시 결과 파일을 열지 않도록 함
+        confidence = None
+        if text_result and text_result.get("confidence"):
+            values = [float(value) for value in text_result["confidence"]]
+            confidence = sum(values) / len(values)
+        return write_behind.add(
+            StrResult,
             video_code=video_code,
             second_result_code=second_result_code,
-            str_result_path=str_result_path
+            str_result_path=str_result_path,
+            text=text_result["text"] if text_result else None,
+            confidence=confidence
         )
-        db.session.add(str_result)
-        db.session.commit()
+
+    def process_str(self, second_result_code, image=None, cancel_token=None):
+        """
+        2차 전처리 결과 하나에 대해 STR 을 수행하고 결과를 저장한다.
+        image (NumPy 배열) 가 주어지면 2차 전처리 결과 파일을 다시 읽지 않는다.
+        """
+        if not second_result_code:
+            return {"status": "error", "message": "second_result_code is required."}, 400
+
+        second_result = self.get_second_preprocessing_result(second_result_code)
+        if not second_result:
+            return {"status": "error", "message": f"Second result with ID {second_result_code} not found."}, 404
+
+        secondprepro_path = second_result.second_result_path
+        if image is not None:
+            secondimage = Image.fromarray(image)
+        elif not os.path.exists(secondprepro_path):
+            return {"status": "error", "message": f"File not found at {secondprepro_path}."}, 404
+        else:
+            secondimage = Image.open(secondprepro_path)
+
+        text_result = self.STRpredict(secondimage, cancel_token=cancel_token)
+
+        str_result_path = os.path.join("./uploaded_videos", f"str_result_{second_result_code}.txt")
+        with open(str_result_path, "w") as f:
+            f.write(text_result['text'])
+
+        str_result_code = self.save_str_result(second_result.video_code, second_result_code, str_result_path, text_result).result()
+        return {
+            "text": text_result['text'],
+            "str_result_code": str_result_code,
+            "str_result_path": str_result_path
+        }, 200
+
+    def STRpredict(self, image: Image.Image, cancel_token=None):
+        key = self.cache.key(image) if self.cache.enabled else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # 스케줄러를 거쳐 다른 요청의 크롭과 함께 배치 추론
+        future = self.scheduler.submit(image)
+        result = cancel_token.wait(future) if cancel_token is not None else future.result()
+        if key is not None:
+            self.cache.put(key, result)
+        return result
 
     @torch.inference_mode()
-    def STRpredict(self, image: Image.Image):
+    def STRpredict_batch(self, images):
         model = self._load_model()
-        image = self._preprocess(image.convert('RGB')).unsqueeze(0)
-        pred = model(image).softmax(-1)
-        label, _ = model.tokenizer.decode(pred)
-        raw_label, raw_confidence = model.tokenizer.decode(pred, raw=True)
-        max_len = len(label[0]) + 1
-        conf = list(map('{:0.1f}'.format, raw_confidence[0][:max_len].tolist()))
-        return {
-            "text": label[0],
-            "raw_text": raw_label[0][:max_len],
-            "confidence": conf
-        }
+        batch = torch.stack([self._preprocess(image.convert('RGB')) for image in images])
+        pred = model(batch).softmax(-1)
+        labels, _ = model.tokenizer.decode(pred)
+        raw_labels, raw_confidences = model.tokenizer.decode(pred, raw=True)
+        results = []
+        for label, raw_label, raw_confidence in zip(labels, raw_labels, raw_confidences):
+            max_len = len(label) + 1
+            conf = list(map('{:0.1f}'.format, raw_confidence[:max_len].tolist()))
+            results.append({
+                "text": label,
+                "raw_text": raw_label[:max_len],
+                "confidence": conf
+            })
+        return results
 
 # STRApp 인스턴스 생성
 str_app = STRApp()
@@ -56,29 +124,15 @@ str_app = STRApp()
 def handle_str_predict(second_code_list):
     try:
         text_results = []
+        str_result_path = None
 
         for second_result_code in second_code_list:
-            if not second_result_code:
-                return jsonify({"status": "error", "message": "second_result_code is required."}), 400
-
-            second_result = str_app.get_second_preprocessing_result(second_result_code)
-            if not second_result:
-                return jsonify({"status": "error", "message": f"Second result with ID {second_result_code} not found."}), 404
-
-            secondprepro_path = second_result.second_result_path
-            if not os.path.exists(secondprepro_path):
-                return jsonify({"status": "error", "message": f"File not found at {secondprepro_path}."}), 404
-
-            secondimage = Image.open(secondprepro_path)
-
-            text_result = str_app.STRpredict(secondimage)
-            text_results.append(text_result['text'])
-
-            str_result_path = os.path.join("./uploaded_videos", f"str_result_{second_result_code}.txt")
-            with open(str_result_path, "w") as f:
-                f.write(text_result['text'])
+            res = str_app.process_str(second_result_code)
+            if res[1] != 200:
+                return jsonify(res[0]), res[1]
 
-            str_app.save_str_result(second_result.video_code, second_result_code, str_result_path)
+            text_results.append(res[0]['text'])
+            str_result_path = res[0]['str_result_path']
 
         print(text_results)
         return {
@@ -0,0 +1,195 @@
+# streaming_pipeline.py
+# YOLO -> 1차 전처리 -> STD -> 2차 전처리 -> STR 을 크기 제한 큐로 연결한 스트리밍 파이프라인
+# 각 단계는 별도 스레드에서 동작하고, 큐가 가득 차면 앞 단계가 기다리므로 (backpressure)
+# 비디오 길이와 관계없이 메모리에 올라가는 중간 결과는 단계당 QUEUE_SIZE 개로 제한된다.
+import os
+import queue
+import threading
+import cv2
+from models import db, YoloResult
+from frame_source import probe_video, frame_index_from_name
+from yolo_handlers import yolo_app, pad_image
+from firstPrepro_handlers import first_prepro_app
+from std_handlers import detectron_handler
+from secondPrepro_handlers import second_prepro_app
+from str_handlers import str_app
+from cancellation import CancelToken
+
+QUEUE_SIZE = int(os.environ.get("REDSWUS_STREAM_QUEUE_SIZE", "8"))
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageFailed(Exception):
+    """스트리밍 단계 처리 실패."""
+
+
+class StreamStage:
+    """
+    upstream 의 항목마다 fn(item) 이 돌려준 결과(0개 이상)를 크기 제한 큐로 넘기는 스레드 단계.
+    이 객체를 순회하면 결과를 순서대로 받을 수 있다.
+    """
+
+    def __init__(self, name, fn, upstream, app, stop_event, maxsize=QUEUE_SIZE):
+        self.name = name
+        self.fn = fn
+        self.upstream = upstream
+        self.app = app
+        self.stop_event = stop_event
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name=f"stream-{name}", daemon=True)
+
+    def _put(self, item):
+        # 소비자가 멈춘 경우(중단/연결 끊김) 영원히 막히지 않도록 주기적으로 확인
+        while not self.stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        upstream = iter(self.upstream)
+        with self.app.app_context():
+            try:
+                for item in upstream:
+                    for output in self.fn(item):
+                        if not self._put(output):
+                            return
+            except Exception as e:
+                self._put(_Failure(StageFailed(f"{self.name}: {e}")))
+            finally:
+                # 앞 단계(제너레이터)를 닫아 비디오 디코더 등 자원을 바로 정리
+                close = getattr(upstream, "close", None)
+                if close is not None:
+                    close()
+                self._put(_DONE)
+                db.session.remove()
+
+    def __iter__(self):
+        self._thread.start()
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+
+def _check(response):
+    if response == 0:
+        return None
+    body = response[0].get_json() if hasattr(response[0], "get_json") else response[0]
+    if response[1] != 200:
+        raise StageFailed(body.get("message") or body.get("error"))
+    return body
+
+
+class StreamingPipeline:
+    """비디오 하나를 스트리밍으로 처리하며 STR 결과를 하나씩 반환한다."""
+
+    def __init__(self, app, video_id, video_path, start_time=None, end_time=None, output_path=None,
+                 cancel_token=None):
+        self.app = app
+        self.video_id = video_id
+        self.video_path = video_path
+        self.start_time = start_time
+        self.end_time = end_time
+        self.output_path = output_path or yolo_app.project_path(video_id)
+        # 단계들이 동시에 실행되므로 단계별 제한 없이 작업 전체 제한 시간만 적용
+        self.cancel_token = cancel_token or CancelToken(stage_timeouts={})
+        # 취소/제한 시간 초과/소비자 중단 모두 같은 이벤트로 모든 단계 스레드를 멈춤
+        self.stop_event = self.cancel_token.event
+        self.yolo_result = None
+        self.fps = None
+
+    def _start(self):
+        _, self.fps = probe_video(self.video_path)
+        # 1차 전처리 결과가 참조할 YoloResult 를 먼저 기록
+        output_path = self.output_path
+        yolo_app.reset_output(output_path)
+        self.padded_folder = os.path.join(yolo_app.crops_path(output_path), "padded")
+        os.makedirs(self.padded_folder, exist_ok=True)
+        with self.app.app_context():
+            self.yolo_result = YoloResult(video_code=self.video_id, yolo_result_path=self.padded_folder)
+            db.session.add(self.yolo_result)
+            db.session.commit()
+            db.session.refresh(self.yolo_result)
+            db.session.expunge(self.yolo_result)  # 다른 스레드에서 속성만 읽음
+        return yolo_app.iter_crops(self.video_path, output_path, start_time=self.start_time, end_time=self.end_time,
+                                   cancel_token=self.cancel_token)
+
+    # 단계별 처리 함수: 입력 하나 -> 출력 리스트
+    # 각 항목은 (크롭 파일명, 코드, 이미지) 로 전달되어 결과의 프레임 번호/시각을 알 수 있다
+    def _yolo_padding(self, item):
+        # 크롭 파일은 기록용이며, 이미지는 YOLO 단계에서 메모리로 바로 받음
+        crop_path, image = item
+        filename = os.path.basename(crop_path)
+        padded_image = pad_image(image)
+        cv2.imwrite(os.path.join(self.padded_folder, filename), padded_image)
+        return [(filename, None, padded_image)]
+
+    def _first_prepro(self, item):
+        filename, _, image = item
+        _, future, processed_image = first_prepro_app.process_image(self.yolo_result, filename, image)
+        return [(filename, future.result(), processed_image)]
+
+    def _std(self, item):
+        filename, first_result_code, image = item
+        body = _check(detectron_handler.handle_std_predict(first_result_code, image=image,
+                                                           cancel_token=self.cancel_token, return_crops=True))
+        if body is None:
+            return []
+        return [(filename, std_result_code, crop) for std_result_code, crop in body["crops"].items()]
+
+    def _second_prepro(self, item):
+        filename, std_result_code, crop = item
+        body = _check(second_prepro_app.process_images(std_result_code, image=crop))
+        return [(filename, body["second_code_number"], body["second_image"])]
+
+    def _str(self, item):
+        filename, second_result_code, image = item
+        body = _check(str_app.process_str(second_result_code, image=image, cancel_token=self.cancel_token))
+        frame_index = frame_index_from_name(filename)
+        return [{
+            "frame_index": frame_index,
+            "timestamp": round(frame_index / self.fps, 3) if frame_index is not None and self.fps else None,
+            "second_result_code": second_result_code,
+            "str_result_code": body["str_result_code"],
+            "text": body["text"]
+        }]
+
+    def __iter__(self):
+        source = self._start()
+        stages = source
+        for name, fn in (
+            ("yolo", self._yolo_padding),
+            ("first_prepro", self._first_prepro),
+            ("std", self._std),
+            ("second_prepro", self._second_prepro),
+            ("str", self._str),
+        ):
+            stages = StreamStage(name, fn, stages, self.app, self.stop_event)
+        try:
+            yield from stages
+            # 제한 시간 초과나 취소로 멈춘 경우 단계 스레드의 실패가 전달되지 않으므로 여기서 알림
+            if self.cancel_token.reason:
+                raise StageFailed(self.cancel_token.reason)
+        finally:
+            # 소비자가 중간에 멈추면 모든 단계 스레드와 비디오 디코더를 정리
+            self.stop_event.set()
+
+    def stop(self, reason="Pipeline stopped."):
+        self.cancel_token.cancel(reason)
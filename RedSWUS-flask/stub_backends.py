@@ -0,0 +1,148 @@
+# stub_backends.py
+# 부하 테스트용 가짜 YOLO / Detectron2 / PARSeq 백엔드
+# 모델 추론 대신 정해진 지연만 흉내 내므로 서버, DB, 파일 I/O 오버헤드만 따로 측정할 수 있다.
+# REDSWUS_STUB_MODELS=1 이면 핸들러가 생성될 때 모델 가중치와 detectron2 를 로드하지 않고 가짜 백엔드를 사용한다
+# (핸들러 생성 시점에 확인하므로 핸들러 import 전에 환경변수를 설정해야 함).
+# 이 모듈 자체는 torch 를 쓰지 않지만 runtime_config 와 핸들러 모듈은 torch 를 import 하므로 torch 설치는 필요하다.
+import os
+import time
+from types import SimpleNamespace
+import cv2
+import numpy as np
+
+STUB_MODELS_ENV = "REDSWUS_STUB_MODELS"
+# 단계별 가짜 지연 (ms): "배치당,항목당"
+DEFAULT_STUB_LATENCY_MS = {"yolo": "0,20", "std": "10,15", "str": "5,1"}
+
+
+def stubs_enabled():
+    return os.environ.get(STUB_MODELS_ENV, "0") == "1"
+
+
+class StubLatency:
+    """호출 한 번에 base_ms + 항목당 per_item_ms 만큼 대기."""
+
+    def __init__(self, base_ms=0.0, per_item_ms=0.0):
+        self.base_ms = base_ms
+        self.per_item_ms = per_item_ms
+
+    def wait(self, items=1):
+        delay = (self.base_ms + self.per_item_ms * items) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+    @classmethod
+    def from_env(cls, stage):
+        # 예: REDSWUS_STUB_LATENCY_MS_STD=10,15
+        value = os.environ.get(f"REDSWUS_STUB_LATENCY_MS_{stage.upper()}", DEFAULT_STUB_LATENCY_MS[stage])
+        base_ms, _, per_item_ms = value.partition(",")
+        return cls(float(base_ms or 0), float(per_item_ms or 0))
+
+
+class StubYOLO:
+    """
+    YOLOApp.detect_batch 와 같은 형식으로 프레임 가운데 영역 하나를 탐지 결과로 반환한다.
+    프레임 디코딩, 크롭/라벨 저장은 실제 경로 (YOLOApp.detect_video) 를 그대로 사용한다.
+    """
+
+    def __init__(self, latency=None, crop_ratio=0.5):
+        self.latency = latency or StubLatency()
+        self.crop_ratio = crop_ratio
+
+    def detect_batch(self, frames):
+        self.latency.wait(len(frames))
+        detections = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            crop_h, crop_w = height * self.crop_ratio, width * self.crop_ratio
+            y1, x1 = (height - crop_h) / 2, (width - crop_w) / 2
+            detections.append([[x1, y1, x1 + crop_w, y1 + crop_h, 0.9, 0]])
+        return detections
+
+
+class _StubTensor:
+    # DetectronHandler.detect 가 사용하는 .numpy() 만 흉내 냄
+    def __init__(self, array):
+        self._array = array
+
+    def numpy(self):
+        return self._array
+
+
+class _StubInstances:
+    """detectron2 Instances 중 DetectronHandler.detect 가 읽는 필드만 가진 객체."""
+
+    def __init__(self, boxes, scores, classes):
+        self.pred_boxes = SimpleNamespace(tensor=_StubTensor(boxes))
+        self.scores = _StubTensor(scores)
+        self.pred_classes = _StubTensor(classes)
+
+    def to(self, device):
+        return self
+
+
+class StubDetectron:
+    """BatchPredictor.predict_batch 와 같은 형식의 결과를 반환한다."""
+
+    def __init__(self, latency=None, boxes_per_image=2, score=0.9):
+        self.latency = latency or StubLatency()
+        self.boxes_per_image = boxes_per_image
+        self.score = score
+
+    def predict_batch(self, images):
+        self.latency.wait(len(images))
+        outputs = []
+        for image in images:
+            height, width = image.shape[:2]
+            # 이미지를 세로로 나눈 가로 띠 모양 텍스트 박스
+            step = height / (self.boxes_per_image + 1)
+            boxes = [
+                [width * 0.1, step * (i + 0.5), width * 0.9, step * (i + 1.0)]
+                for i in range(self.boxes_per_image)
+            ]
+            outputs.append({"instances": _StubInstances(
+                np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                np.full(self.boxes_per_image, self.score, dtype=np.float32),
+                np.zeros(self.boxes_per_image, dtype=np.int64),
+            )})
+        return outputs
+
+
+class StubParseq:
+    """STRApp.STRpredict_batch 와 같은 형식의 결과를 반환한다."""
+
+    def __init__(self, latency=None, text="STUB"):
+        self.latency = latency or StubLatency()
+        self.text = text
+
+    def predict_batch(self, images):
+        self.latency.wait(len(images))
+        confidence = ['{:0.1f}'.format(0.9)] * (len(self.text) + 1)
+        return [{"text": self.text, "raw_text": self.text, "confidence": confidence} for _ in images]
+
+
+def stub_batch_fn(stage):
+    """핸들러의 배치 스케줄러에 넣을 가짜 batch_fn (지연은 REDSWUS_STUB_LATENCY_MS_<STAGE>)."""
+    latency = StubLatency.from_env(stage)
+    if stage == "yolo":
+        return StubYOLO(latency=latency).detect_batch
+    if stage == "std":
+        return StubDetectron(latency=latency).predict_batch
+    return StubParseq(latency=latency).predict_batch
+
+
+def make_sample_video(path, seconds=5, fps=10, size=(640, 360)):
+    """샘플 비디오가 없을 때 쓸 합성 비디오 (움직이는 글자) 를 만든다."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    try:
+        for index in range(int(seconds * fps)):
+            frame = np.full((height, width, 3), 255, dtype=np.uint8)
+            cv2.putText(frame, f"REDSWUS {index:04d}", (20 + index % 100, height // 2),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
@@ -0,0 +1,58 @@
+# 클라이언트 연결 끊김 확인 / 취소 토큰 테스트
+import os
+import resource
+import socket
+
+import pytest
+
+from cancellation import CancelToken, JobCancelled, DeadlineExceeded, client_disconnect_check
+
+
+@pytest.fixture
+def socket_pair():
+    server, client = socket.socketpair()
+    yield server, client
+    server.close()
+    client.close()
+
+
+def test_open_connection_is_not_disconnected(socket_pair):
+    server, _ = socket_pair
+    assert client_disconnect_check({"werkzeug.socket": server})() is False
+
+
+def test_closed_connection_is_disconnected(socket_pair):
+    server, client = socket_pair
+    client.close()
+    assert client_disconnect_check({"werkzeug.socket": server})() is True
+
+
+def test_high_file_descriptor_is_not_treated_as_disconnect(socket_pair):
+    # select() 는 fd >= 1024 에서 ValueError 를 던지므로 끊김으로 오판하면 안 됨
+    server, _ = socket_pair
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and hard <= 1100:
+        pytest.skip("file descriptor limit too low")
+    if soft <= 1100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (1200, hard))
+    high_fd = os.dup2(server.fileno(), 1100)
+    high = socket.socket(fileno=high_fd)
+    try:
+        assert client_disconnect_check({"werkzeug.socket": high})() is False
+    finally:
+        high.close()
+        if soft <= 1100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_cancel_and_deadline_raise():
+    token = CancelToken(job_timeout=0, stage_timeouts={})
+    token.check()
+    token.cancel("stop")
+    with pytest.raises(JobCancelled):
+        token.check()
+
+    expired = CancelToken(job_timeout=0.000001, stage_timeouts={})
+    with pytest.raises(DeadlineExceeded):
+        while True:
+            expired.check()
@@ -0,0 +1,87 @@
+# inference_scheduler 배치/취소/예외 전파 테스트
+import threading
+import time
+
+import pytest
+
+from inference_scheduler import BatchScheduler
+
+
+def blocking_scheduler(batch_fn, **kwargs):
+    # 첫 입력("block")이 release 될 때까지 워커를 붙잡아 두어 그동안 들어온 입력이 다음 배치로 모이게 함
+    release = threading.Event()
+    seen = []
+
+    def run(items):
+        seen.append(list(items))
+        if items == ["block"]:
+            release.wait(timeout=5)
+        return batch_fn(items)
+
+    scheduler = BatchScheduler(run, **kwargs)
+    first = scheduler.submit("block")
+    while not seen:
+        time.sleep(0.001)
+    return scheduler, first, release, seen
+
+
+def test_queued_items_run_in_one_batch():
+    scheduler, first, release, seen = blocking_scheduler(lambda items: [f"r-{item}" for item in items],
+                                                         max_batch_size=4, max_wait=0.05)
+    futures = [scheduler.submit(index) for index in range(6)]
+    release.set()
+
+    assert first.result(timeout=5) == "r-block"
+    assert [future.result(timeout=5) for future in futures] == [f"r-{index}" for index in range(6)]
+    # 최대 배치 크기로 나뉘어 실행됨
+    assert seen[1:] == [[0, 1, 2, 3], [4, 5]]
+    assert scheduler.stats()["batches"] == 3
+
+
+def test_cancelled_futures_are_not_run():
+    scheduler, first, release, seen = blocking_scheduler(lambda items: list(items), max_batch_size=8)
+    keep, cancelled = scheduler.submit("keep"), scheduler.submit("cancelled")
+    assert cancelled.cancel()
+    release.set()
+
+    assert keep.result(timeout=5) == "keep"
+    assert cancelled.cancelled()
+    assert all("cancelled" not in batch for batch in seen)
+
+
+def test_batch_exception_fans_out_to_every_future():
+    def fail(items):
+        if items != ["block"]:
+            raise ValueError("model failed")
+        return items
+
+    scheduler, first, release, _ = blocking_scheduler(fail, max_batch_size=8)
+    futures = [scheduler.submit(index) for index in range(3)]
+    release.set()
+
+    assert first.result(timeout=5) == "block"
+    for future in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            future.result(timeout=5)
+
+
+def test_per_item_exception_only_fails_that_future():
+    scheduler = BatchScheduler(lambda items: [ValueError(item) if item == "bad" else item for item in items],
+                               max_batch_size=8, max_wait=0.05)
+    good, bad = scheduler.submit("good"), scheduler.submit("bad")
+
+    assert good.result(timeout=5) == "good"
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+
+def test_missing_results_fail_leftover_futures():
+    scheduler, first, release, _ = blocking_scheduler(lambda items: list(items)[:1], max_batch_size=8)
+    futures = [scheduler.submit(index) for index in range(3)]
+    release.set()
+
+    assert first.result(timeout=5) == "block"
+    assert futures[0].result(timeout=5) == 0
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError, match="returned 1 results for 3 inputs"):
+            future.result(timeout=5)
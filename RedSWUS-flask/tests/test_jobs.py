@@ -0,0 +1,92 @@
+# 작업 체크포인트 재개 멱등성 테스트 (가짜 모델 백엔드 + SQLite 파일 DB)
+import os
+from datetime import datetime
+
+import pytest
+
+# 핸들러 인스턴스가 생성될 때 가짜 백엔드를 고르므로 import 전에 설정
+os.environ.setdefault("REDSWUS_STUB_MODELS", "1")
+for _stage in ("YOLO", "STD", "STR"):
+    os.environ.setdefault(f"REDSWUS_STUB_LATENCY_MS_{_stage}", "0,0")
+
+for _module in ("cv2", "torch", "torchvision", "scipy", "skimage", "imageio", "matplotlib", "flask_sqlalchemy"):
+    pytest.importorskip(_module)
+
+from flask import Flask
+from models import db, Video, StdResult, SecondPreprocessingResult, StrResult, JobCheckpoint
+from db_config import configure_database
+from persistence import write_behind
+from stub_backends import make_sample_video
+from yolo_handlers import yolo_app
+from firstPrepro_handlers import first_prepro_app
+from std_handlers import detectron_handler
+from secondPrepro_handlers import second_prepro_app
+from str_handlers import str_app
+from job_handlers import job_app
+
+
+@pytest.fixture
+def job_env(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    configure_database(app, f"sqlite:///{tmp_path / 'jobs.db'}")
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    # 결과 파일은 임시 폴더에 저장 (STR 결과는 ./uploaded_videos 기준)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("uploaded_videos")
+    monkeypatch.setattr(yolo_app, "output_root", str(tmp_path / "mp4_to_img"))
+    for handler, folder in ((first_prepro_app, "first"), (detectron_handler, "std"), (second_prepro_app, "second")):
+        os.makedirs(tmp_path / folder)
+        monkeypatch.setattr(handler, "output_folder", str(tmp_path / folder))
+    monkeypatch.setattr(write_behind, "app", app)
+
+    video_path = make_sample_video(str(tmp_path / "uploaded_videos" / "sample.mp4"), seconds=2)
+    with app.app_context():
+        video = Video(upload_time=datetime.utcnow(), video_path=video_path)
+        db.session.add(video)
+        db.session.commit()
+        yield app, video.video_code
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_resume_after_str_failure_does_not_duplicate_results(job_env, monkeypatch):
+    app, video_code = job_env
+    process_str = str_app.process_str
+    calls = []
+
+    def fail_once_midway(second_result_code, **kwargs):
+        # 몇 개는 성공시킨 뒤 STR 단계 중간에 한 번 실패
+        calls.append(second_result_code)
+        if len(calls) == 3:
+            raise RuntimeError("STR backend unavailable")
+        return process_str(second_result_code, **kwargs)
+
+    monkeypatch.setattr(str_app, "process_str", fail_once_midway)
+
+    job = job_app.create_job(video_code)
+    body, status_code = job_app.run(job.job_id)
+    assert status_code == 500
+    assert body["stage"] == "str"
+
+    std_count = StdResult.query.count()
+    second_count = SecondPreprocessingResult.query.count()
+    assert std_count > 3 and second_count == std_count
+    assert StrResult.query.count() == 2
+
+    body, status_code = job_app.run(job.job_id)
+    assert status_code == 200
+
+    # 완료된 단계는 체크포인트로 건너뛰므로 앞 단계 결과 행이 다시 생기지 않음
+    assert StdResult.query.count() == std_count
+    assert SecondPreprocessingResult.query.count() == second_count
+    # 실패 전에 끝난 STR 항목은 다시 실행하지 않음 (실패한 항목부터 이어서 실행)
+    assert StrResult.query.count() == second_count
+    assert len({row.second_result_code for row in StrResult.query.all()}) == second_count
+    assert len(calls) == second_count + 1
+    assert len(body["str_result"]) == second_count
+
+    checkpoints = JobCheckpoint.query.filter_by(job_id=job.job_id, stage="str").all()
+    assert len(checkpoints) == len({checkpoint.input_code for checkpoint in checkpoints}) == second_count
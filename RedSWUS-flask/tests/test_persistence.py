@@ -0,0 +1,62 @@
+# write-behind 저장소 + 서버 DB 용 커넥션 풀 설정 테스트 (SQLite 파일로 대신 실행)
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from flask import Flask
+from models import db, Video
+from db_config import configure_database, engine_options
+from persistence import WriteBehindWriter
+
+
+@pytest.fixture
+def pooled_app(tmp_path):
+    # 서버 DB URL 일 때의 풀 설정(pool_size, max_overflow, pool_pre_ping ...)을 SQLite 파일 DB 에 적용
+    app = Flask(__name__)
+    configure_database(app, f"sqlite:///{tmp_path / 'pooled.db'}")
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options("postgresql://user@localhost/redswus")
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_server_url_uses_connection_pool():
+    options = engine_options("postgresql://user@localhost/redswus")
+    assert options["pool_size"] > 0
+    assert options["pool_pre_ping"] is True
+    assert "pool_size" not in engine_options("sqlite:///video_analysis.db")
+
+
+def test_write_behind_concurrent_adds_with_pooled_engine(pooled_app):
+    writer = WriteBehindWriter(pooled_app)
+
+    def add_videos(worker):
+        futures = [writer.add(Video, upload_time=datetime.utcnow(), video_path=f"video_{worker}_{index}.mp4")
+                   for index in range(20)]
+        return [future.result(timeout=10) for future in futures]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        codes = [code for codes in pool.map(add_videos, range(4)) for code in codes]
+
+    assert len(set(codes)) == 80
+    with pooled_app.app_context():
+        assert Video.query.count() == 80
+        assert db.engine.pool.size() == engine_options("postgresql://user@localhost/redswus")["pool_size"]
+
+
+def test_write_behind_commits_immediately_when_idle(pooled_app):
+    writer = WriteBehindWriter(pooled_app)
+    # 큐가 비어 있으면 배치 대기 시간과 무관하게 바로 커밋
+    writer.scheduler.max_wait = 5.0
+    start = time.monotonic()
+    code = writer.add(Video, upload_time=datetime.utcnow(), video_path="single.mp4").result(timeout=10)
+    assert time.monotonic() - start < 1.0
+    with pooled_app.app_context():
+        assert db.session.get(Video, code).video_path == "single.mp4"
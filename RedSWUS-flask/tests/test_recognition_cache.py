@@ -0,0 +1,33 @@
+# recognition_cache 키 충돌 테스트
+import pytest
+
+pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from recognition_cache import RecognitionCache
+
+
+def render_text(text, size=(128, 32)):
+    # 같은 크기/위치/글꼴로 그린 텍스트 크롭 (PARSeq 입력 크기)
+    image = Image.new("RGB", size, "white")
+    ImageDraw.Draw(image).text((8, 10), text, fill="black")
+    return image
+
+
+def test_same_layout_different_text_has_different_keys():
+    texts = ["AB1234", "CD5678", "AB1235", "EXIT 12", "EXIT 21"]
+    keys = [RecognitionCache.key(render_text(text)) for text in texts]
+    assert len(set(keys)) == len(texts)
+
+
+def test_same_image_has_same_key():
+    assert RecognitionCache.key(render_text("AB1234")) == RecognitionCache.key(render_text("AB1234"))
+
+
+def test_cache_hit_returns_stored_result():
+    cache = RecognitionCache(capacity=2)
+    key = RecognitionCache.key(render_text("AB1234"))
+    cache.put(key, {"text": "AB1234"})
+    assert cache.get(key) == {"text": "AB1234"}
+    assert cache.get(RecognitionCache.key(render_text("CD5678"))) is None
@@ -1,6 +1,7 @@
 # video_handlers.py
 from flask import request
 from models import db, Video
+from frame_source import probe_video
 from datetime import datetime
 import os
 
@@ -22,8 +23,9 @@ class VideoAPP:
         try:
             file.save(file_path)
 
-            # 데이터베이스에 비디오 정보 저장
-            video = Video(video_path=file_path, upload_time=datetime.utcnow())
+            # 데이터베이스에 비디오 정보 저장 (fps 는 결과 내보내기 시 프레임 번호 -> 시각 변환에 사용)
+            _, fps = probe_video(file_path)
+            video = Video(video_path=file_path, upload_time=datetime.utcnow(), fps=fps or None)
             db.session.add(video)
             db.session.commit()
 
@@ -0,0 +1,194 @@
+# visualization_handlers.py
+# 저장된 박스/텍스트로 원본 프레임 위에 STD/STR 결과를 필요할 때만 그려 주는 핸들러
+# 렌더링 결과는 용량 제한이 있는 썸네일 캐시에 두고 ETag 로 재전송을 막는다.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import cv2
+from sqlalchemy import select
+from models import db, Video, YoloResult, FirstPreprocessingResult, StdResult, SecondPreprocessingResult, StrResult
+from frame_source import read_frame, crop_ordinal_from_name
+from yolo_handlers import YOLOApp, PAD_X, PAD_Y
+
+THUMBNAIL_CACHE_BYTES = int(float(os.environ.get("REDSWUS_THUMBNAIL_CACHE_MB", "64")) * 1024 * 1024)
+THUMBNAIL_MAX_SIDE = int(os.environ.get("REDSWUS_THUMBNAIL_MAX_SIDE", "1280"))
+JPEG_QUALITY = int(os.environ.get("REDSWUS_THUMBNAIL_JPEG_QUALITY", "85"))
+
+
+class ThumbnailCache:
+    """총 바이트 수로 용량을 제한하는 LRU 캐시 (스레드 안전)."""
+
+    def __init__(self, max_bytes=THUMBNAIL_CACHE_BYTES):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+
+        # 지표
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = value
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "max_bytes": self.max_bytes,
+            "size_bytes": self.size_bytes,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 프레임 주석 렌더링 클래스
+class FrameAnnotator:
+    def __init__(self, cache=None):
+        self.cache = cache or ThumbnailCache()
+        self.renders = 0
+
+    def frame_results(self, video_code, frame_index):
+        """프레임 하나의 (1차 전처리 경로, YOLO 결과 경로, 박스, 점수, 텍스트) 행 목록."""
+        stmt = (
+            select(
+                FirstPreprocessingResult.first_result_path, YoloResult.yolo_result_path,
+                StdResult.std_result_code, StdResult.box_x1, StdResult.box_y1, StdResult.box_x2, StdResult.box_y2,
+                StdResult.score, StrResult.str_result_code, StrResult.text,
+            )
+            .select_from(FirstPreprocessingResult)
+            .join(YoloResult, YoloResult.yolo_result_code == FirstPreprocessingResult.yolo_result_code)
+            .join(StdResult, StdResult.first_result_code == FirstPreprocessingResult.first_result_code)
+            .outerjoin(SecondPreprocessingResult, SecondPreprocessingResult.std_result_code == StdResult.std_result_code)
+            .outerjoin(StrResult, StrResult.second_result_code == SecondPreprocessingResult.second_result_code)
+            .where(FirstPreprocessingResult.video_code == video_code,
+                   FirstPreprocessingResult.frame_index == frame_index)
+            .order_by(StdResult.std_result_code)
+        )
+        return db.session.execute(stmt).all()
+
+    @staticmethod
+    def etag(video_code, frame_index, max_side, rows):
+        # 결과가 추가/변경되면 바뀌고, 같은 결과면 렌더링 없이 같은 값이 나옴
+        digest = hashlib.sha1(repr((video_code, frame_index, max_side, [tuple(row) for row in rows])).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _crop_origins(video_path, frame_index, rows, frame_shape):
+        """
+        YOLO 크롭이 프레임 어디에서 잘렸는지 (x1, y1, x2, y2) 를 detect.py 라벨에서 찾는다.
+        키: 1차 전처리 경로. 라벨이 없으면 (stub 백엔드, 이전 실행) 빈 dict.
+        """
+        height, width = frame_shape[:2]
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        origins = {}
+        labels = {}
+        for row in rows:
+            if row.first_result_path in origins:
+                continue
+            label_path = os.path.join(YOLOApp.labels_path(row.yolo_result_path), f"{stem}_{frame_index:07d}.txt")
+            if label_path not in labels:
+                labels[label_path] = []
+                if os.path.exists(label_path):
+                    with open(label_path) as f:
+                        labels[label_path] = [line for line in f if line.strip()]
+            ordinal = crop_ordinal_from_name(row.first_result_path)
+            if ordinal is not None and ordinal < len(labels[label_path]):
+                origins[row.first_result_path] = YOLOApp.crop_box(labels[label_path][ordinal], width, height)
+        return origins
+
+    def draw(self, frame, video_path, frame_index, rows):
+        origins = self._crop_origins(video_path, frame_index, rows, frame.shape)
+        for crop in set(origins.values()):
+            cv2.rectangle(frame, crop[:2], crop[2:], (255, 128, 0), 2)
+
+        thickness = max(1, round(max(frame.shape[:2]) / 640))
+        for row in rows:
+            origin = origins.get(row.first_result_path)
+            if origin is None or row.box_x1 is None:
+                continue
+            # STD 박스는 패딩된 YOLO 크롭 기준 좌표
+            offset_x, offset_y = origin[0] - PAD_X, origin[1] - PAD_Y
+            x1, y1 = row.box_x1 + offset_x, row.box_y1 + offset_y
+            x2, y2 = row.box_x2 + offset_x, row.box_y2 + offset_y
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 200, 0), thickness)
+            label = row.text if row.text is not None else ""
+            if row.score is not None:
+                label = f"{label} ({row.score:.2f})".strip()
+            if label:
+                # OpenCV 기본 글꼴은 ASCII 만 그리므로 표시할 수 없는 글자는 ? 로 대체
+                label = label.encode("ascii", "replace").decode()
+                cv2.putText(frame, label, (x1, max(12, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.5 * thickness, (0, 200, 0), thickness)
+        return frame
+
+    def render(self, video_code, frame_index, max_side=THUMBNAIL_MAX_SIDE, if_none_match=None):
+        """
+        (body, status) 를 반환한다. 성공 시 body 는 {"image": JPEG bytes, "etag": ...},
+        클라이언트의 ETag 가 같으면 ({"etag": ...}, 304).
+        """
+        video = Video.query.filter_by(video_code=video_code).first()
+        if not video:
+            return {"status": "error", "message": f"Video with ID {video_code} not found."}, 404
+
+        rows = self.frame_results(video_code, frame_index)
+        etag = self.etag(video_code, frame_index, max_side, rows)
+        if if_none_match and etag in if_none_match:
+            return {"etag": etag}, 304
+
+        image = self.cache.get(etag)
+        if image is None:
+            frame = read_frame(video.video_path, frame_index)
+            if frame is None:
+                return {"status": "error", "message": f"Frame {frame_index} not found in video {video_code}."}, 404
+            frame = self.draw(frame, video.video_path, frame_index, rows)
+
+            # 썸네일 크기로 축소 (확대는 하지 않음)
+            scale = max_side / max(frame.shape[:2])
+            if scale < 1:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if not ok:
+                return {"status": "error", "message": "Failed to encode annotated frame."}, 500
+            image = encoded.tobytes()
+            self.renders += 1
+            self.cache.put(etag, image)
+        return {"image": image, "etag": etag}, 200
+
+    def stats(self):
+        return dict(self.cache.stats(), renders=self.renders)
+
+# FrameAnnotator 인스턴스 생성
+frame_annotator = FrameAnnotator()
+
+# 핸들러 함수
+def handle_annotated_frame(video_id, frame_index, max_side=THUMBNAIL_MAX_SIDE, if_none_match=None):
+    max_side = max(32, min(int(max_side), 4096))
+    return frame_annotator.render(video_id, frame_index, max_side=max_side, if_none_match=if_none_match)
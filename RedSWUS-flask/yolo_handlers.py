@@ -1,48 +1,228 @@
 import os
+import shutil
+import time
+from collections import deque
 import torch
 import cv2
 from flask import Flask, request, jsonify
 from models import db, YoloResult
+from runtime_config import YOLO_MAX_BATCH_SIZE, BATCH_MAX_WAIT
+from frame_source import FrameSource, VIDEO_EXTENSIONS
+from inference_scheduler import BatchScheduler
+from stub_backends import stubs_enabled, stub_batch_fn
+from cancellation import JobCancelled
+
+# 프레임 샘플링 설정: 초당 N 장 (0 이면 stride 사용), 키프레임 전용 빠른 모드
+SAMPLE_FPS = float(os.environ.get("REDSWUS_SAMPLE_FPS", "0")) or None
+KEYFRAMES_ONLY = os.environ.get("REDSWUS_KEYFRAMES_ONLY", "0") == "1"
+
+# 후속 단계로 넘길 YOLO 클래스 (detect.py --save-crop 의 crops/<클래스 이름> 폴더와 같은 이름)
+CROP_CLASS = "glasses"
+
+# YOLO 크롭 패딩 (STD 입력용 흰색 여백, 위아래 PAD_Y / 좌우 PAD_X 픽셀)
+PAD_Y, PAD_X = 160, 380
+
+def pad_image(image):
+    return cv2.copyMakeBorder(
+        image, PAD_Y, PAD_Y, PAD_X, PAD_X, cv2.BORDER_CONSTANT, value=[255, 255, 255]
+    )
+
+def unpad_image(image):
+    # pad_image 로 붙인 여백을 뺀 원래 크롭 영역 (뷰)
+    height, width = image.shape[:2]
+    return image[PAD_Y:height - PAD_Y, PAD_X:width - PAD_X]
 
 # YOLO 핸들러 클래스
 class YOLOApp:
-    def __init__(self):
+    def __init__(self, output_root="./mp4_to_img", img_size=640, conf=0.5):
         self.custom_weights = './pt/yolo.pt'  # 로컬 YOLOv9 가중치 경로
+        self.output_root = output_root
+        self.img_size = img_size
+        self.conf = conf
+        self._model = None
+        # 디코딩된 프레임을 메모리에서 바로 모아 배치 탐지 (프레임 JPEG 저장/재읽기 없음)
+        batch_fn = stub_batch_fn("yolo") if stubs_enabled() else self.detect_batch
+        self.scheduler = BatchScheduler(batch_fn, max_batch_size=YOLO_MAX_BATCH_SIZE,
+                                        max_wait=BATCH_MAX_WAIT, name="yolo-scheduler")
+
+    def _load_model(self):
+        # detect.py 프로세스 대신 같은 프로세스에서 모델을 한 번만 로드
+        if self._model is None:
+            model = torch.hub.load('./yolov9', 'custom', path=self.custom_weights, source='local')
+            # 기존 파이프라인이 crops/glasses 만 읽었던 것과 같이 CROP_CLASS 탐지만 남김
+            names = model.names.items() if isinstance(model.names, dict) else enumerate(model.names)
+            classes = [index for index, name in names if name == CROP_CLASS]
+            if not classes:
+                raise ValueError(f"YOLO model has no '{CROP_CLASS}' class.")
+            model.classes = classes
+            self._model = model
+        return self._model
 
-    def detect_video(self, video_path, output_path, stride=5, img_size=640, conf=0.5):
-        # 비디오 파일 처리
+    def detect_batch(self, frames):
+        """BGR 프레임 배치를 탐지해 프레임마다 [(x1, y1, x2, y2, conf, cls), ...] (프레임 좌표) 를 반환한다."""
+        model = self._load_model()
+        model.conf = self.conf
+        results = model([frame[..., ::-1] for frame in frames], size=self.img_size)  # AutoShape 는 RGB 입력
+        return [det.tolist() for det in results.xyxy]
+
+    @staticmethod
+    def expand_box(x1, y1, x2, y2, frame_width, frame_height):
+        """detect.py --save-crop (save_one_box) 과 같이 박스를 2% + 10px 넓혀 자를 영역을 구한다."""
+        pad_x = (x2 - x1) * 0.01 + 5
+        pad_y = (y2 - y1) * 0.01 + 5
+        x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        x2, y2 = min(frame_width, int(x2 + pad_x)), min(frame_height, int(y2 + pad_y))
+        return x1, y1, x2, y2
+
+    def detect_boxes(self, frame, cancel_token=None):
+        """프레임 한 장의 탐지 결과. 배치 스케줄러를 거치므로 여러 요청의 프레임이 한 배치로 묶인다."""
+        future = self.scheduler.submit(frame)
+        return cancel_token.wait(future) if cancel_token is not None else future.result()
+
+    def detect_frame(self, frame, cancel_token=None):
+        """BGR 프레임 한 장에서 객체를 탐지하고 크롭(ROI 뷰) 리스트를 반환한다."""
+        height, width = frame.shape[:2]
+        crops = []
+        for x1, y1, x2, y2, _, _ in self.detect_boxes(frame, cancel_token):
+            x1, y1, x2, y2 = self.expand_box(x1, y1, x2, y2, width, height)
+            if x2 > x1 and y2 > y1:
+                crops.append(frame[y1:y2, x1:x2])
+        return crops
+
+    def iter_detections(self, source, cancel_token=None):
+        """
+        FrameSource 의 프레임을 디코딩하는 대로 탐지에 넘기고 (frame_index, frame, detections) 를 순서대로 반환한다.
+        배치 두 개 분량까지 미리 넣어 두므로 디코딩과 탐지가 겹쳐서 실행된다.
+        """
+        window = self.scheduler.max_batch_size * 2
+        pending = deque()
         try:
-            os.system(f"python3 ./yolov9/detect.py --weights {self.custom_weights} --vid-stride {stride} \
-                        --img {img_size} --conf {conf} --exist-ok --source {video_path} --save-crop --project {output_path}")
-            print(f"비디오 파일 {video_path} 처리가 완료되었습니다.")
-        except Exception as e:
-            print(f"비디오 처리 중 오류 발생: {e}")
+            for index, _, frame in source:
+                if cancel_token is not None:
+                    cancel_token.check()
+                pending.append((index, frame, self.scheduler.submit(frame)))
+                if len(pending) >= window:
+                    index, frame, future = pending.popleft()
+                    yield index, frame, cancel_token.wait(future) if cancel_token is not None else future.result()
+            while pending:
+                index, frame, future = pending.popleft()
+                yield index, frame, cancel_token.wait(future) if cancel_token is not None else future.result()
+        finally:
+            # 중간에 멈추면 아직 배치에 들어가지 않은 프레임은 탐지하지 않음
+            for _, _, future in pending:
+                future.cancel()
 
-# YOLOAPP 인스턴스 생성
-yolo_app = YOLOApp()
+    def save_detections(self, stem, index, frame, detections, output_path):
+        """
+        detect.py --save-crop --save-txt 와 같은 파일명/형식으로 크롭과 라벨을 저장하고 (크롭 경로, 크롭 이미지) 리스트를 반환한다.
+        크롭: <stem>_<7자리 프레임 번호>.jpg, ...2.jpg, ...3.jpg / 라벨: cls x y w h (0~1 정규화)
+        """
+        height, width = frame.shape[:2]
+        crops_folder = self.crops_path(output_path)
+        labels_folder = os.path.join(output_path, "exp", "labels")
+        crops = []
+        label_lines = []
+        for x1, y1, x2, y2, _, cls in detections:
+            crop_x1, crop_y1, crop_x2, crop_y2 = self.expand_box(x1, y1, x2, y2, width, height)
+            if crop_x2 <= crop_x1 or crop_y2 <= crop_y1:
+                continue
+            ordinal = f"{len(crops) + 1}" if crops else ""
+            crop_path = os.path.join(crops_folder, f"{stem}_{index:07d}{ordinal}.jpg")
+            # 프레임 전체가 메모리에 남지 않도록 크롭만 복사
+            crop = frame[crop_y1:crop_y2, crop_x1:crop_x2].copy()
+            cv2.imwrite(crop_path, crop)
+            crops.append((crop_path, crop))
+            label_lines.append(f"{int(cls)} {(x1 + x2) / 2 / width:g} {(y1 + y2) / 2 / height:g} "
+                               f"{(x2 - x1) / width:g} {(y2 - y1) / height:g}\n")
+        if label_lines:
+            with open(os.path.join(labels_folder, f"{stem}_{index:07d}.txt"), "w") as f:
+                f.writelines(label_lines)
+        return crops
 
-def handle_yolo_predict(video_id):
-    torch.cuda.empty_cache() 
+    def project_path(self, video_id):
+        # 비디오마다 별도 폴더를 사용해 이전 실행의 크롭이 섞이지 않도록 함
+        return os.path.join(self.output_root, f"video_{video_id}")
 
-    if 'file' not in request.files:
-        return jsonify({"message": "No file part in the request"}), 400
+    @staticmethod
+    def reset_output(output_path):
+        # 이전 (실패/취소된) 실행의 크롭과 라벨을 지움. 남아 있으면 크롭이 중복되고 크롭 순번-라벨 줄 대응이 어긋남
+        shutil.rmtree(os.path.join(output_path, "exp"), ignore_errors=True)
 
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"message": "No file selected for uploading"}), 400
+    @staticmethod
+    def crops_path(output_path):
+        return os.path.join(output_path, "exp", "crops", CROP_CLASS)
 
-    # 파일 저장 경로 설정
-    file_path = os.path.join("./uploaded_videos", file.filename)
+    @staticmethod
+    def labels_path(yolo_result_path):
+        # YoloResult 경로 (<project>/exp/crops/glasses/padded) 기준 detect.py --save-txt 라벨 폴더
+        exp_path = os.path.dirname(os.path.dirname(os.path.dirname(yolo_result_path)))
+        return os.path.join(exp_path, "labels")
 
-    # 파일 처리
-    if file.filename.endswith(('.mp4', '.avi', '.mkv', '.mov', '.wmv')):
+    @staticmethod
+    def crop_box(label_line, frame_width, frame_height):
+        """
+        라벨 한 줄 (cls x y w h, 0~1 정규화) 을 detect.py --save-crop 이 실제로 자른 영역 (x1, y1, x2, y2) 으로 변환.
+        save_one_box 와 같이 박스를 2% + 10px 넓힌다.
+        """
+        _, x, y, w, h = (float(value) for value in label_line.split()[:5])
+        x, w = x * frame_width, w * frame_width
+        y, h = y * frame_height, h * frame_height
+        return YOLOApp.expand_box(x - w / 2, y - h / 2, x + w / 2, y + h / 2, frame_width, frame_height)
+
+    def detect_video(self, video_path, output_path, stride=5, sample_fps=SAMPLE_FPS, keyframes_only=KEYFRAMES_ONLY,
+                     start_time=None, end_time=None, cancel_token=None):
+        """
+        필요한 프레임만 디코딩해 메모리에서 바로 탐지하고 크롭/라벨을 저장한다.
+        프레임 통계 (디코딩/탐지한 프레임 수, 처리량) 를 반환한다.
+        """
+        os.makedirs(self.crops_path(output_path), exist_ok=True)
+        os.makedirs(os.path.join(output_path, "exp", "labels"), exist_ok=True)
+        source = FrameSource(video_path, stride=stride, sample_fps=sample_fps, keyframes_only=keyframes_only,
+                             start_time=start_time, end_time=end_time)
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+
+        start = time.perf_counter()
+        crops = 0
+        for index, frame, detections in self.iter_detections(source, cancel_token):
+            crops += len(self.save_detections(stem, index, frame, detections, output_path))
+        elapsed = time.perf_counter() - start
+
+        frame_stats = source.stats()
+        frame_stats.update({
+            "crops": crops,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_fps": round(frame_stats["emitted_frames"] / elapsed, 2) if elapsed else 0.0,
+        })
+        print(f"비디오 파일 {video_path} 처리가 완료되었습니다. {frame_stats}")
+        return frame_stats
+
+    def iter_crops(self, video_path, output_path, stride=5, sample_fps=SAMPLE_FPS, keyframes_only=KEYFRAMES_ONLY,
+                   start_time=None, end_time=None, cancel_token=None):
+        """
+        프레임을 디코딩하는 대로 탐지해 (저장된 크롭 파일 경로, 크롭 이미지) 를 바로바로 반환하는 제너레이터.
+        후속 단계가 비디오 전체의 탐지가 끝나기를 기다리지 않고 먼저 처리할 수 있다.
+        """
+        os.makedirs(self.crops_path(output_path), exist_ok=True)
+        os.makedirs(os.path.join(output_path, "exp", "labels"), exist_ok=True)
+        source = FrameSource(video_path, stride=stride, sample_fps=sample_fps, keyframes_only=keyframes_only,
+                             start_time=start_time, end_time=end_time)
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        for index, frame, detections in self.iter_detections(source, cancel_token):
+            yield from self.save_detections(stem, index, frame, detections, output_path)
+
+    def process_video(self, video_id, file_path, output_path=None, cancel_token=None):
+        """
+        저장된 비디오 파일로 YOLO 탐지 + 패딩을 수행하고 YoloResult 를 기록한다.
+        업로드 요청 없이도 (작업 재개 시) 호출할 수 있다.
+        """
+        output_path = output_path or self.project_path(video_id)
         try:
+            self.reset_output(output_path)
             # YOLOv9 모델을 사용하여 이미지 처리
-            out_put_path = "./mp4_to_img"
-            yolo_app.detect_video(file_path, out_put_path)
+            frame_stats = self.detect_video(file_path, output_path, cancel_token=cancel_token)
 
             # 처리된 이미지 저장 경로
-            result_image_path = os.path.join('./mp4_to_img', "exp", "crops", "glasses")
+            result_image_path = self.crops_path(output_path)
 
             padded_image_path = os.path.join(result_image_path, f"padded")
             os.makedirs(padded_image_path, exist_ok=True)  # exist_ok=True는 이미 폴더가 있으면 에러를 방지합니다.
@@ -56,34 +236,53 @@ def handle_yolo_predict(video_id):
                     if image is None:
                         raise FileNotFoundError(f"이미지를 찾을 수 없음: {image_path}")
 
-                    # RGB 변환
-                    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-                    # 패딩 추가
-                    padded_image = cv2.copyMakeBorder(
-                        image, 160, 160, 380, 380, cv2.BORDER_CONSTANT, value=[255, 255, 255]
-                    )
+                    # 패딩 추가 (흰색 여백이라 채널 순서와 무관)
+                    padded_image = pad_image(image)
 
                     # 패딩된 이미지 저장
                     padded_image_path = os.path.join(result_image_path, f"padded", filename)
-                    cv2.imwrite(padded_image_path, cv2.cvtColor(padded_image, cv2.COLOR_RGB2BGR))
+                    cv2.imwrite(padded_image_path, padded_image)
                     print(f"패딩된 이미지 저장 완료: {padded_image_path}")
 
-                    # 데이터베이스에 결과 저장
-                padded_image_path = os.path.join(result_image_path, f"padded")
-                detection_result = YoloResult(
-                    video_code=video_id,
-                    yolo_result_path=padded_image_path
-                )
-                db.session.add(detection_result)
-                db.session.commit()
+            # 데이터베이스에 결과 저장
+            padded_image_path = os.path.join(result_image_path, f"padded")
+            detection_result = YoloResult(
+                video_code=video_id,
+                yolo_result_path=padded_image_path
+            )
+            db.session.add(detection_result)
+            db.session.commit()
 
-            return jsonify({
+            return {
                 "message": "Image processed successfully",
                 "yolo_result_code": detection_result.yolo_result_code,
-                "output_image": padded_image_path
-            }), 200
+                "output_image": padded_image_path,
+                "frame_stats": frame_stats
+            }, 200
+        except JobCancelled:
+            raise
         except Exception as e:
-            return jsonify({"message": f"Error during processing: {str(e)}"}), 500
+            return {"message": f"Error during processing: {str(e)}"}, 500
+
+# YOLOAPP 인스턴스 생성
+yolo_app = YOLOApp()
+
+def handle_yolo_predict(video_id):
+    torch.cuda.empty_cache() 
+
+    if 'file' not in request.files:
+        return jsonify({"message": "No file part in the request"}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"message": "No file selected for uploading"}), 400
+
+    # 파일 저장 경로 설정
+    file_path = os.path.join("./uploaded_videos", file.filename)
+
+    # 파일 처리
+    if file.filename.endswith(VIDEO_EXTENSIONS):
+        result = yolo_app.process_video(video_id, file_path)
+        return jsonify(result[0]), result[1]
     else:
         return jsonify({"message": "Unsupported file format. Only MP4, AVI, MKV, MOV, WMV are supported."}), 400